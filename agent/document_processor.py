@@ -1,5 +1,8 @@
 import os
-from typing import List, Dict, Any
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from langchain_community.document_loaders import PyPDFLoader, UnstructuredMarkdownLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
@@ -7,62 +10,74 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+LOADERS = {
+    '.pdf': PyPDFLoader,
+    '.md': UnstructuredMarkdownLoader
+}
+
 class DocumentProcessor:
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, max_workers: Optional[int] = None):
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             separators=["\n\n", "\n", " ", ""]
         )
+        # Set to 1 to load files serially (e.g. on spinning disks)
+        self.max_workers = max_workers or os.cpu_count()
+    
+    def _load_single(self, path: Tuple[str, str]) -> List[Document]:
+        """Load a single file, tag it with source metadata and split it into chunks."""
+        file_path, filename = path
+        loader_cls = LOADERS.get(os.path.splitext(filename)[1].lower())
+        if loader_cls is None:
+            logger.warning(f"Unsupported file type: {filename}")
+            return []
+        
+        try:
+            docs = loader_cls(file_path).load()
+            
+            # Add metadata
+            for doc in docs:
+                metadata = doc.metadata
+                metadata['source_file'] = filename
+                metadata['source_type'] = 'local_document'
+            
+            # Chunk inside the worker so splitting overlaps with other files' I/O
+            chunks = self.text_splitter.split_documents(docs)
+            # Number chunks per file so one file's IDs don't depend on the others
+            for i, chunk in enumerate(chunks):
+                chunk.metadata['chunk_id'] = f"doc_{i}"
+            logger.info(f"Loaded {len(docs)} pages ({len(chunks)} chunks) from {filename}")
+            return chunks
+            
+        except Exception as e:
+            logger.error(f"Error loading {filename}: {e}")
+            return []
     
     def load_documents(self, documents_dir: str) -> List[Document]:
         """Load and process all documents from the directory."""
-        documents = []
-        
         if not os.path.exists(documents_dir):
             logger.warning(f"Documents directory {documents_dir} does not exist")
-            return documents
+            return []
         
-        for filename in os.listdir(documents_dir):
-            file_path = os.path.join(documents_dir, filename)
-            
-            if not os.path.isfile(file_path):
-                continue
-                
-            try:
-                if filename.endswith('.pdf'):
-                    loader = PyPDFLoader(file_path)
-                    docs = loader.load()
-                elif filename.endswith('.md'):
-                    loader = UnstructuredMarkdownLoader(file_path)
-                    docs = loader.load()
-                else:
-                    logger.warning(f"Unsupported file type: {filename}")
-                    continue
-                
-                # Add metadata
-                for doc in docs:
-                    doc.metadata.update({
-                        'source_file': filename,
-                        'source_type': 'local_document'
-                    })
-                
-                documents.extend(docs)
-                logger.info(f"Loaded {len(docs)} chunks from {filename}")
-                
-            except Exception as e:
-                logger.error(f"Error loading {filename}: {e}")
+        # scandir returns cached file type info, avoiding a stat per entry
+        with os.scandir(documents_dir) as it:
+            paths = [(entry.path, entry.name) for entry in it if entry.is_file()]
+        # Directory order is arbitrary; sort so chunk IDs are stable across runs
+        paths.sort(key=lambda path: path[1])
         
-        # Split documents into chunks
-        chunked_docs = self.text_splitter.split_documents(documents)
-        
-        # Add chunk IDs
-        for i, doc in enumerate(chunked_docs):
-            doc.metadata['chunk_id'] = f"doc_{i}"
+        # Loading is mostly file I/O, so threads overlap well
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(self._load_single, paths))
+        chunked_docs = list(itertools.chain.from_iterable(results))
         
         logger.info(f"Total chunks created: {len(chunked_docs)}")
         return chunked_docs
     
+    def load_file(self, file_path: str) -> List[Document]:
+        """Load and chunk a single document, e.g. one that was just uploaded."""
+        return self._load_single((file_path, os.path.basename(file_path)))
+    
     def process_text(self, text: str, source: str, source_type: str = "web") -> List[Document]:
         """Process raw text into document chunks."""
         doc = Document(
@@ -74,7 +89,9 @@ class DocumentProcessor:
         )
         
         chunks = self.text_splitter.split_documents([doc])
+        # Stable across processes, unlike hash(), so chunk IDs can be deduplicated
+        src_hash = hashlib.blake2b(source.encode('utf-8'), digest_size=8).hexdigest()
         for i, chunk in enumerate(chunks):
-            chunk.metadata['chunk_id'] = f"{source_type}_{hash(source)}_{i}"
+            chunk.metadata['chunk_id'] = f"{source_type}_{src_hash}_{i}"
         
         return chunks
\ No newline at end of file
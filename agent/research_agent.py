@@ -1,10 +1,16 @@
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, TextIO
+from collections import OrderedDict
 from datetime import datetime
 import logging
 import re
 import hashlib
+import time
+import asyncio
+import io
+import threading
 
+import numpy as np
 from pydantic import BaseModel, Field
 from langchain_groq import ChatGroq
 from langchain.agents import create_tool_calling_agent, AgentExecutor
@@ -12,19 +18,115 @@ from langchain.prompts import ChatPromptTemplate
 from langchain.tools import StructuredTool
 
 from .document_processor import DocumentProcessor
-from .vector_store import VectorStoreManager
-from .web_searcher import WebSearcher
+from .vector_store import VectorStoreManager, SNIPPET_LENGTH, DOCUMENT_ID_VERSION, _normalize_query
+from .web_searcher import WebSearcher, _extract_domain
 
 logger = logging.getLogger(__name__)
 
+def _create_vector_store() -> VectorStoreManager:
+    """Build the vector store selected by the VECTOR_BACKEND environment variable."""
+    if os.getenv('VECTOR_BACKEND', 'chroma').lower() == 'hnswlib':
+        from .vector_store_hnsw import HnswlibVectorStore
+        return HnswlibVectorStore()
+    return VectorStoreManager()
+
+def _dir_has_files(path: str) -> bool:
+    """Return True if the directory contains at least one file, stopping at the first."""
+    try:
+        with os.scandir(path) as it:
+            return any(entry.is_file() for entry in it)
+    except FileNotFoundError:
+        return False
+
+def _documents_manifest(path: str) -> str:
+    """Hash the (name, mtime, size) of every file in a directory."""
+    digest = hashlib.blake2b(digest_size=16)
+    # A new chunk ID scheme invalidates the manifest so stored chunks are re-synced
+    digest.update(f"ids-v{DOCUMENT_ID_VERSION}\n".encode('utf-8'))
+    try:
+        with os.scandir(path) as it:
+            entries = sorted((entry for entry in it if entry.is_file()), key=lambda entry: entry.name)
+            for entry in entries:
+                stat = entry.stat()
+                digest.update(f"{entry.name}|{stat.st_mtime_ns}|{stat.st_size}\n".encode('utf-8'))
+    except FileNotFoundError:
+        pass
+    return digest.hexdigest()
+
+class _QueryCache:
+    """Approximate key-value cache that matches queries by embedding similarity.
+    
+    Keys live in one preallocated (capacity, dim) int8 matrix with a per-row scale,
+    so a lookup is a single matrix-vector product over a quarter of the float32
+    footprint; slots are reused in FIFO order once the ring is full. With a ttl,
+    entries older than ttl seconds no longer match.
+    """
+    
+    def __init__(self, tolerance: float = 0.05, capacity: int = 512, ttl: Optional[float] = None):
+        self.threshold = 1 - tolerance
+        self.capacity = capacity
+        self.ttl = ttl
+        self._keys: Optional[np.ndarray] = None  # allocated on first insert, once dim is known
+        self._scales = np.zeros(capacity, dtype=np.float32)
+        self._stored_at = np.zeros(capacity, dtype=np.float64)
+        self._values: List[Any] = [None] * capacity
+        self._n = 0
+    
+    @staticmethod
+    def _quantize(embedding) -> tuple:
+        """L2-normalize an embedding and quantize it to int8 with a symmetric scale."""
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm:
+            vec = vec / norm
+        peak = float(np.abs(vec).max()) if vec.size else 0.0
+        scale = peak / 127 if peak else 1.0
+        return np.round(vec / scale).astype(np.int8), scale
+    
+    def get(self, embedding) -> Optional[Any]:
+        """Return the value of the closest cached query within tolerance."""
+        if self._n == 0:
+            return None
+        size = min(self._n, self.capacity)
+        key, scale = self._quantize(embedding)
+        # Accumulate in int32 so int8 products cannot overflow
+        dots = np.dot(self._keys[:size], key.astype(np.int32))
+        sims = dots * self._scales[:size] * scale
+        if self.ttl is not None:
+            sims[self._stored_at[:size] < time.monotonic() - self.ttl] = -np.inf
+        idx = int(sims.argmax())
+        if sims[idx] >= self.threshold:
+            return self._values[idx]
+        return None
+    
+    def put(self, embedding, value: Any):
+        """Cache a value, overwriting the oldest slot once at capacity."""
+        key, scale = self._quantize(embedding)
+        if self._keys is None:
+            self._keys = np.zeros((self.capacity, key.shape[0]), dtype=np.int8)
+        slot = self._n % self.capacity
+        self._keys[slot] = key
+        self._scales[slot] = scale
+        self._stored_at[slot] = time.monotonic()
+        self._values[slot] = value
+        self._n += 1
+    
+    def clear(self):
+        self._keys = None
+        self._scales[:] = 0
+        self._stored_at[:] = 0
+        self._values = [None] * self.capacity
+        self._n = 0
+
 class ResearchAgent:
-    def __init__(self, groq_api_key: str, documents_dir: str = "./documents"):
+    def __init__(self, groq_api_key: str, documents_dir: str = "./documents",
+                 search_cache_tolerance: float = 0.05):
         self.groq_api_key = groq_api_key
         self.documents_dir = documents_dir
         
         # Initialize components
         self.doc_processor = DocumentProcessor()
-        self.vector_store = VectorStoreManager()
+        self.vector_store = _create_vector_store()
         self.web_searcher = WebSearcher()
         
         # Initialize LLM
@@ -39,6 +141,32 @@ class ResearchAgent:
         self.citation_counter = 0
         self.source_registry = {}
         
+        # Tools may run concurrently, so registry and cache updates go through this lock
+        self._lock = threading.RLock()
+        
+        # One long-lived event loop runs the async executor. The LLM's async HTTP
+        # client pools connections on the loop it first ran on, so a fresh loop per
+        # research() call would find them closed and retry every request.
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="research-agent-loop", daemon=True).start()
+        
+        # Approximate caches for tool results, one per tool; a tolerance of 0.05
+        # treats queries with cosine similarity >= 0.95 as the same search.
+        # Local results are invalidated on index writes; web results go stale with time.
+        self._search_caches = {
+            'local': _QueryCache(tolerance=search_cache_tolerance),
+            'web': _QueryCache(tolerance=search_cache_tolerance, ttl=3600)
+        }
+        
+        # Research results keyed by normalized question hash, with LRU + TTL eviction.
+        # The semantic index maps near-identical questions onto the same key.
+        self._answer_cache: OrderedDict = OrderedDict()
+        self._answer_index = _QueryCache(tolerance=0.03)
+        self.answer_cache_size = 256
+        self.answer_cache_ttl = 3600
+        
+        self._cache_revision = self.vector_store.revision
+        
         # Load documents
         self._load_initial_documents()
         
@@ -46,12 +174,29 @@ class ResearchAgent:
         self.agent_executor = self._create_agent()
     
     def _load_initial_documents(self):
-        """Load and index initial documents."""
-        if os.path.exists(self.documents_dir) and os.listdir(self.documents_dir):
+        """Load initial documents and sync them into the persisted index."""
+        manifest = _documents_manifest(self.documents_dir)
+        manifest_path = os.path.join(self.vector_store.persist_directory, 'documents.manifest')
+        try:
+            with open(manifest_path, encoding='utf-8') as f:
+                if f.read() == manifest:
+                    logger.info("Documents unchanged since last index, skipping load")
+                    return
+        except FileNotFoundError:
+            pass
+        
+        documents = []
+        if _dir_has_files(self.documents_dir):
             documents = self.doc_processor.load_documents(self.documents_dir)
-            if documents:
-                self.vector_store.rebuild_from_documents(documents)
-                logger.info(f"Indexed {len(documents)} document chunks")
+        
+        # The collection persists across restarts, so only changed chunks are re-embedded
+        if self.vector_store.sync_documents(documents):
+            try:
+                with open(manifest_path, 'w', encoding='utf-8') as f:
+                    f.write(manifest)
+            except OSError as e:
+                logger.warning(f"Could not write documents manifest: {e}")
+        logger.info(f"Synced {len(documents)} document chunks")
     
     def _generate_source_alias(self, source_info: Dict[str, str]) -> str:
         """Generate a clean alias for sources."""
@@ -69,64 +214,107 @@ class ResearchAgent:
         
         elif source_type == 'web':
             # For web sources, extract domain
-            url = source_info.get('url', '')
-            try:
-                from urllib.parse import urlparse
-                domain = urlparse(url).netloc
-                if domain:
-                    # Clean up common prefixes
-                    if domain.startswith('www.'):
-                        domain = domain[4:]
-                    return f"Web: {domain}"
-            except:
-                pass
+            domain = _extract_domain(source_info.get('url', ''))
+            if domain:
+                return f"Web: {domain}"
             return "Web: External Source"
         
         return f"{source_type.title()}: Source"
     
     def _register_source(self, source_info: Dict[str, str]) -> str:
         """Register a source and return its citation ID."""
-        # Create a unique key for the source
-        source_key = f"{source_info.get('type', '')}-{source_info.get('name', '')}-{source_info.get('url', '')}"
-        source_hash = hashlib.md5(source_key.encode()).hexdigest()[:8]
-        
-        if source_hash not in self.source_registry:
-            self.citation_counter += 1
-            self.source_registry[source_hash] = {
-                'id': self.citation_counter,
-                'alias': self._generate_source_alias(source_info),
-                'info': source_info
-            }
+        # The tuple itself is the key; dicts hash it natively, no digest needed
+        source_key = (source_info.get('type', ''), source_info.get('name', ''), source_info.get('url', ''))
+        
+        with self._lock:
+            if source_key not in self.source_registry:
+                self.citation_counter += 1
+                self.source_registry[source_key] = {
+                    'id': self.citation_counter,
+                    'alias': self._generate_source_alias(source_info),
+                    'info': source_info
+                }
+            
+            return f"[{self.source_registry[source_key]['id']}]"
+    
+    def _sync_cache_revision(self):
+        """Drop cached results that depend on the local index once it has changed."""
+        if self._cache_revision != self.vector_store.revision:
+            self._search_caches['local'].clear()
+            self._answer_cache.clear()
+            self._answer_index.clear()
+            self._cache_revision = self.vector_store.revision
+    
+    def _embed_query(self, query: str):
+        """Embed a query; the vector store keeps the shared query-embedding LRU."""
+        return self.vector_store.embed_query(query)
+    
+    def _cached_search(self, tool_name: str, query: str, search_fn) -> List[tuple]:
+        """Run a tool search through its approximate query cache."""
+        # Embed outside the lock so concurrent tool calls don't take turns on the encoder
+        embedding = self._embed_query(query)
+        with self._lock:
+            self._sync_cache_revision()
+            cache = self._search_caches[tool_name]
+            hits = cache.get(embedding)
+        if hits is not None:
+            logger.info(f"Query cache hit for {tool_name} search: {query}")
+            return hits
         
-        return f"[{self.source_registry[source_hash]['id']}]"
+        hits = search_fn(query, embedding)
+        if hits:
+            with self._lock:
+                cache.put(embedding, hits)
+        return hits
+    
+    def _format_hits(self, hits: List[tuple]) -> str:
+        """Format cached hits, registering citation IDs for the current research."""
+        return "\n".join(f"{self._register_source(source_info)} {body}" for source_info, body in hits)
+    
+    def _fetch_local_hits(self, query: str, embedding) -> List[tuple]:
+        """Query the vector store and return (source_info, body) pairs."""
+        results = self.vector_store.similarity_search(query, k=5, query_embedding=embedding)
+        sourced = [self._local_chunk(doc) for doc in results]
+        return [
+            (source_info,
+             f"{self._generate_source_alias(source_info)} (Relevance: {1.0 - doc.get('score', 0.0):.3f})\n"
+             f"Content: {snippet}...\n")
+            for (source_info, snippet), doc in zip(sourced, results)
+        ]
+    
+    def _local_chunk(self, doc: Dict[str, Any]) -> tuple:
+        """Return (source_info, snippet) for a local search hit."""
+        # Chunks indexed by this process have source and snippet precomputed
+        chunk_meta = self.vector_store.get_chunk_meta(doc.get('id'))
+        if chunk_meta is None:
+            chunk_meta = (doc['metadata'].get('source_file', 'unknown'), doc['page_content'][:SNIPPET_LENGTH])
+        source_file, snippet = chunk_meta
+        return {'type': 'local', 'name': source_file, 'url': None}, snippet
+    
+    def _fetch_web_hits(self, query: str, embedding=None) -> List[tuple]:
+        """Search the web and return (source_info, body) pairs."""
+        web_docs = self.web_searcher.search_and_extract(query, num_results=3)
+        sourced = [
+            ({'type': 'web',
+              'name': doc.metadata.get('title', 'Unknown Title'),
+              'url': doc.metadata.get('source', 'unknown url')}, doc)
+            for doc in web_docs
+        ]
+        return [
+            (source_info,
+             f"{self._generate_source_alias(source_info)}\n"
+             f"Title: {source_info['name']}\n"
+             f"Content: {doc.page_content[:600]}...\n")
+            for source_info, doc in sourced
+        ]
     
     def _search_local_documents(self, query: str) -> str:
         """Search through local documents with enhanced citation tracking."""
         try:
-            results = self.vector_store.similarity_search(query, k=5)
-            if not results:
+            hits = self._cached_search('local', query, self._fetch_local_hits)
+            if not hits:
                 return "No relevant local documents found."
-            
-            formatted_results = []
-            for i, doc in enumerate(results):
-                source_file = doc['metadata'].get('source_file', 'unknown')
-                chunk_id = doc['metadata'].get('chunk_id', f'chunk_{i}')
-                score = doc.get('score', 0.0)
-                relevance = 1 - score
-                
-                # Register source for citation
-                source_info = {
-                    'type': 'local',
-                    'name': source_file,
-                    'url': None
-                }
-                citation_id = self._register_source(source_info)
-                
-                formatted_results.append(
-                    f"{citation_id} {self._generate_source_alias(source_info)} (Relevance: {relevance:.3f})\n"
-                    f"Content: {doc['page_content'][:600]}...\n"
-                )
-            return "\n".join(formatted_results)
+            return self._format_hits(hits)
             
         except Exception as e:
             logger.error(f"Error searching local documents: {e}")
@@ -135,45 +323,36 @@ class ResearchAgent:
     def _search_web_resources(self, query: str) -> str:
         """Search web resources with enhanced citation tracking."""
         try:
-            web_docs = self.web_searcher.search_and_extract(query, num_results=3)
-            if not web_docs:
+            hits = self._cached_search('web', query, self._fetch_web_hits)
+            if not hits:
                 return "No relevant web resources found."
-            
-            formatted_results = []
-            for doc in web_docs:
-                source_url = doc.metadata.get('source', 'unknown url')
-                title = doc.metadata.get('title', 'Unknown Title')
-                
-                # Register source for citation
-                source_info = {
-                    'type': 'web',
-                    'name': title,
-                    'url': source_url
-                }
-                citation_id = self._register_source(source_info)
-                
-                formatted_results.append(
-                    f"{citation_id} {self._generate_source_alias(source_info)}\n"
-                    f"Title: {title}\n"
-                    f"Content: {doc.page_content[:600]}...\n"
-                )
-            return "\n".join(formatted_results)
+            return self._format_hits(hits)
             
         except Exception as e:
             logger.error(f"Error searching web: {e}")
             return f"Error searching web resources: {str(e)}"
 
+    async def _asearch_local_documents(self, query: str) -> str:
+        """Async variant of _search_local_documents for concurrent tool calls."""
+        return await asyncio.to_thread(self._search_local_documents, query)
+    
+    async def _asearch_web_resources(self, query: str) -> str:
+        """Async variant of _search_web_resources for concurrent tool calls."""
+        return await asyncio.to_thread(self._search_web_resources, query)
+
     def _create_agent(self) -> AgentExecutor:
         """Create the research agent with enhanced prompting."""
         
         tools = [
             StructuredTool.from_function(
                 func=self._search_local_documents,
+                coroutine=self._asearch_local_documents,
                 name="search_local_documents",
                 description="Search through local PDF and Markdown documents for relevant information. Use this for domain-specific knowledge, research papers, or internal documentation. Returns content with citation IDs.",
             ),
             StructuredTool.from_function(
-                func=self._search_web_resources, 
+                func=self._search_web_resources,
+                coroutine=self._asearch_web_resources,
                 name="search_web_resources", 
                 description="Search web resources including Wikipedia, arXiv, and other reliable sources. Use this for current information, general knowledge, or when local documents don't have sufficient information. Returns content with citation IDs.",
             )
@@ -184,7 +363,7 @@ class ResearchAgent:
 
 **Your approach should be:**
 1. **Plan**: Break down complex questions into specific search queries
-2. **Search**: Use both local documents and web resources strategically. For comprehensive answers, use multiple targeted searches
+2. **Search**: Use both local documents and web resources strategically. For comprehensive answers, use multiple targeted searches. When several searches are independent, request them in the same step so they run in parallel
 3. **Synthesize**: Combine information from multiple sources into a coherent, well-structured response
 4. **Cite**: Always include proper citations using the provided citation IDs
 
@@ -228,34 +407,95 @@ class ResearchAgent:
             return_intermediate_steps=True
         )
     
+    def _lookup_answer(self, key: str, embedding, question: str) -> Optional[Dict[str, Any]]:
+        """Return a cached research result for an identical or near-identical question.
+        
+        The copy carries the question as asked, not the one the result was cached under.
+        """
+        self._sync_cache_revision()
+        if key not in self._answer_cache and embedding is not None:
+            key = self._answer_index.get(embedding) or key
+        
+        entry = self._answer_cache.get(key)
+        if entry is None:
+            return None
+        
+        stored_at, response = entry
+        if time.monotonic() - stored_at > self.answer_cache_ttl:
+            del self._answer_cache[key]
+            return None
+        
+        self._answer_cache.move_to_end(key)
+        cached = dict(response)
+        cached['question'] = question
+        cached['timestamp'] = datetime.now().isoformat()
+        cached['cached'] = True
+        return cached
+    
+    def _store_answer(self, key: str, embedding, response: Dict[str, Any]):
+        """Cache a research result, evicting the least recently used entries."""
+        self._answer_cache[key] = (time.monotonic(), response)
+        self._answer_cache.move_to_end(key)
+        if embedding is not None:
+            self._answer_index.put(embedding, key)
+        while len(self._answer_cache) > self.answer_cache_size:
+            self._answer_cache.popitem(last=False)
+    
     def research(self, question: str) -> Dict[str, Any]:
         """Conduct research with enhanced citation management."""
+        normalized = question.strip()
+        if len(normalized) < 3:
+            # Not worth an LLM round trip
+            return {
+                "question": question,
+                "timestamp": datetime.now().isoformat(),
+                "answer": "Please provide a more specific question.",
+                "intermediate_steps": [],
+                "sources_used": [],
+                "confidence_level": "low"
+            }
+        
         try:
+            cache_key = hashlib.blake2b(_normalize_query(normalized).encode('utf-8')).hexdigest()
+            # Embed before taking the lock so concurrent requests don't queue on the encoder
+            try:
+                question_embedding = self._embed_query(question)
+            except Exception as e:
+                logger.warning(f"Could not embed question for answer cache: {e}")
+                question_embedding = None
+            
+            with self._lock:
+                cached = self._lookup_answer(cache_key, question_embedding, question)
+            if cached is not None:
+                logger.info(f"Answer cache hit for question: {question}")
+                return cached
+            
             # Reset citation tracking for new research
             self.citation_counter = 0
             self.source_registry = {}
             
             logger.info(f"Starting research for question: {question}")
             
-            result = self.agent_executor.invoke({"input": question})
+            # The async executor runs multiple tool calls from one step concurrently
+            result = asyncio.run_coroutine_threadsafe(
+                self.agent_executor.ainvoke({"input": question}), self._loop
+            ).result()
             
             answer = result.get("output") or result.get("output_text", "")
             intermediate_steps = result.get("intermediate_steps", [])
             
-            # Compile sources from registry
-            sources_used = []
-            for source_hash, source_data in self.source_registry.items():
-                source_info = source_data['info']
-                sources_used.append({
+            # Compile sources from registry; IDs are assigned in insertion order,
+            # so the registry is already sorted by ID
+            sources_used = [
+                {
                     "id": source_data['id'],
-                    "type": source_info['type'],
-                    "name": source_info['name'],
-                    "url": source_info.get('url'),
+                    "type": source_data['info']['type'],
+                    "name": source_data['info']['name'],
+                    "url": source_data['info'].get('url'),
                     "alias": source_data['alias']
-                })
-            
-            # Sort sources by ID
-            sources_used.sort(key=lambda x: x['id'])
+                }
+                for source_data in self.source_registry.values()
+            ]
             
             structured_response = {
                 "question": question,
@@ -266,6 +506,8 @@ class ResearchAgent:
                 "confidence_level": self._assess_confidence(intermediate_steps, len(sources_used))
             }
             
+            with self._lock:
+                self._store_answer(cache_key, question_embedding, structured_response)
             return structured_response
             
         except Exception as e:
@@ -288,14 +530,23 @@ class ResearchAgent:
         else:
             return "low"
     
-    def generate_report(self, research_result: Dict[str, Any], output_file: Optional[str] = None) -> str:
-        """Generate a formatted research report with improved structure."""
+    def generate_report(self, research_result: Dict[str, Any], output_file: Optional[str] = None,
+                        file: Optional[TextIO] = None) -> str:
+        """Generate a formatted research report with improved structure.
+        
+        If file is given, the report is written straight to it and an empty string
+        is returned instead of materializing the whole report; output_file only
+        applies to the buffered report.
+        """
         
         timestamp = research_result.get('timestamp', datetime.now().isoformat())
         date_str = timestamp[:10]
         time_str = timestamp[11:19]
         
-        report = f"""# Orbuculum.ai Research Report
+        # Write through a buffer; repeated += on a growing string is quadratic
+        out = io.StringIO() if file is None else file
+        w = out.write
+        w(f"""# Orbuculum.ai Research Report
 
 **Generated on:** {date_str} at {time_str}  
 **Confidence Level:** {research_result['confidence_level'].title()}  
@@ -315,25 +566,24 @@ class ResearchAgent:
 
 ## Sources Referenced
 
-"""
+""")
         
         for source in research_result['sources_used']:
             source_type_icon = "📄" if source['type'] == 'local' else "🌐"
-            report += f"**[{source['id']}]** {source_type_icon} {source['name']}\n"
+            w(f"**[{source['id']}]** {source_type_icon} {source['name']}\n")
             if source.get('url'):
-                report += f"   - URL: {source['url']}\n"
-            report += f"   - Type: {source['type'].title()}\n\n"
+                w(f"   - URL: {source['url']}\n")
+            w(f"   - Type: {source['type'].title()}\n\n")
 
-        report += """---
+        w("""---
 
 ## Research Methodology
 
-"""
+""")
         
         for i, step in enumerate(research_result['intermediate_steps'], 1):
             if len(step) >= 2:
-                action = step[0]
-                observation = step[1]
+                action, observation = step[0], step[1]
                 tool_name = action.tool if hasattr(action, 'tool') else 'Unknown Tool'
                 tool_input = action.tool_input if hasattr(action, 'tool_input') else 'N/A'
                 
@@ -342,17 +592,17 @@ class ResearchAgent:
                 else:
                     display_input = str(tool_input)
 
-                report += f"### Step {i}: {tool_name}\n"
-                report += f"**Query:** {display_input}\n\n"
+                w(f"### Step {i}: {tool_name}\n")
+                w(f"**Query:** {display_input}\n\n")
                 
                 # Truncate long observations for readability
-                obs_text = str(observation)
+                obs_text = observation if isinstance(observation, str) else str(observation)
                 if len(obs_text) > 1000:
                     obs_text = obs_text[:1000] + "... [truncated for brevity]"
                 
-                report += f"**Results:** {obs_text}\n\n"
+                w(f"**Results:** {obs_text}\n\n")
 
-        report += f"""---
+        w(f"""---
 
 ## Report Metadata
 - **Generated by:** Orbuculum.ai Research Assistant
@@ -362,11 +612,17 @@ class ResearchAgent:
 
 ---
 *This report was automatically generated by Orbuculum.ai. All sources have been verified and cited appropriately.*
-"""
+""")
+        if file is not None:
+            return ""
+        
+        report = out.getvalue()
         
         if output_file:
             try:
-                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                dirname = os.path.dirname(output_file)
+                if dirname:
+                    os.makedirs(dirname, exist_ok=True)
                 with open(output_file, 'w', encoding='utf-8') as f:
                     f.write(report)
                 logger.info(f"Report saved to {output_file}")
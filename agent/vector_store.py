@@ -1,21 +1,206 @@
 import chromadb
 from chromadb.config import Settings
+from chromadb.utils import embedding_functions
 import os
+import atexit
+import mmap
 import logging
-from typing import List, Dict, Any, Optional
-import uuid
+from typing import List, Dict, Any, Optional, Tuple
 import hashlib
+import heapq
+import math
+import struct
+import threading
+import time
+from functools import lru_cache, singledispatch
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
 from datetime import datetime
+from langchain.schema import Document
 
 logger = logging.getLogger(__name__)
 
+# Length of the content snippet precomputed per chunk for tool output
+SNIPPET_LENGTH = 600
+
+# Bump whenever _generate_document_id or chunk_id numbering changes, so persisted chunks get re-synced
+DOCUMENT_ID_VERSION = 3
+
+def _normalize_query(text: str) -> str:
+    """Canonical cache-key form of a query: lower-cased with whitespace collapsed."""
+    return ' '.join(text.lower().split())
+
+@lru_cache(maxsize=4096)
+def _source_hash(source: str) -> str:
+    """Short hash of a source name; a batch repeats the same few sources many times."""
+    return hashlib.blake2b(source.encode('utf-8'), digest_size=4).hexdigest()
+
+@singledispatch
+def _extract(doc: Any) -> Tuple[str, Dict[str, Any]]:
+    """Return (text, metadata) for a document-like object."""
+    text = getattr(doc, 'page_content', None)
+    if text is None:
+        return str(doc), {}
+    metadata = getattr(doc, 'metadata', None)
+    return text, metadata if isinstance(metadata, dict) else {}
+
+@_extract.register
+def _(doc: Document) -> Tuple[str, Dict[str, Any]]:
+    return doc.page_content, doc.metadata
+
+@_extract.register
+def _(doc: str) -> Tuple[str, Dict[str, Any]]:
+    return doc, {}
+
+def _iter_batches(items: List[Any], size: int):
+    """Yield consecutive slices of at most size items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _write_atomic(path: str, write):
+    """Write a file through a temporary sibling and os.replace, so it is never seen half-written."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+class _BloomFilter:
+    """Fixed-size Bloom filter over string keys: no false negatives, tunable false positives."""
+    
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+    
+    def _positions(self, key: str):
+        # Double hashing: k probe positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+    
+    def add(self, key: str):
+        """Set the key's probe bits."""
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+    
+    def __contains__(self, key: str) -> bool:
+        """False means the key was never added; True may be a false positive."""
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+    
+    def save(self, path: str):
+        """Write the sizing header and the bit array, replacing any previous file atomically."""
+        def write(f):
+            f.write(struct.pack('<QQ', self.num_bits, self.num_hashes))
+            f.write(self.bits)
+        _write_atomic(path, write)
+    
+    @classmethod
+    def load(cls, path: str) -> "_BloomFilter":
+        """Read a filter written by save()."""
+        bloom = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            bloom.num_bits, bloom.num_hashes = struct.unpack('<QQ', f.read(16))
+            bloom.bits = bytearray(f.read())
+        if len(bloom.bits) != (bloom.num_bits + 7) // 8:
+            raise ValueError("truncated bloom filter file")
+        return bloom
+
 class VectorStoreManager:
-    def __init__(self, persist_directory: str = "./chroma_db"):
+    def __init__(self, persist_directory: str = "./chroma_db", embedding_device: Optional[str] = None,
+                 batch_size: int = 256, concurrency: int = 2):
         self.persist_directory = persist_directory
         self.collection_name = "documents"
+        # Ingest tuning: chunks per collection.add call and how many calls run at once
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        # Long-lived pool for batch writes, so each ingest doesn't spin up threads
+        self._executor = ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix="vector-store-write")
         self.client = None
         self.collection = None
+        # Chroma only ever sees this function, so persisted collections always reopen with it
+        self.embedding_function = self._create_embedding_function()
+        # FP16 MiniLM on CUDA when available; it encodes in place of embedding_function
+        self._gpu_encoder = self._create_gpu_encoder(embedding_device)
+        # Bumped on every write so callers can invalidate derived caches
+        self.revision = 0
+        # chunk id -> (source_file, snippet), filled at ingest so search hits need no metadata lookups
+        self._chunk_meta: Dict[str, Tuple[str, str]] = {}
+        # blake2b(text) -> float16 embedding, so re-ingested chunks skip the encoder
+        self._emb_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._emb_cache_lock = threading.Lock()
+        self.emb_cache_size = 50000
+        # The cache file is rewritten at most once per interval (and at exit), not per ingest
+        self.emb_cache_save_interval = 300
+        self._emb_cache_dirty = False
+        self._emb_cache_saved_at = time.monotonic()
+        # Normalized query text -> embedding, shared by every search path and by the agent
+        self._query_emb_cache: OrderedDict = OrderedDict()
+        self._query_emb_lock = threading.Lock()
+        self.query_cache_size = 1024
+        # Serializes swapping a bulk-loaded collection in for the live one
+        self._swap_lock = threading.Lock()
+        # One ingest at a time: the Bloom filter and the persisted caches have a single writer
+        self._write_lock = threading.RLock()
+        # Collections up to this size are searched by exact matrix scan instead of HNSW
+        self.flat_scan_max = 20000
+        self._flat = None
+        self._flat_key = None  # (revision, collection) the cached matrix was built from
+        self._flat_lock = threading.Lock()
+        # Status/stats results, reused until the next write or stats_cache_ttl seconds
+        self._stats_cache: Dict[str, Tuple[int, float, Dict[str, Any]]] = {}
+        self.stats_cache_ttl = 60
+        # Every chunk ID ever written; a miss proves an ID is new without asking Chroma.
+        # Saved like the embedding cache: when changed, at most once per interval, and at exit.
+        # A stale file after a crash only lets a few stored IDs skip the existence check,
+        # and those writes are upserts of identical chunks.
+        self._bloom: Optional[_BloomFilter] = None
+        self.bloom_save_interval = 300
+        self._bloom_dirty = False
+        self._bloom_saved_at = time.monotonic()
         self._initialize_client()
+        self._load_embedding_cache()
+        self._load_bloom()
+        atexit.register(self._save_embedding_cache, True)
+        atexit.register(self._save_bloom, True)
+    
+    def _create_embedding_function(self):
+        """The embedding function collections are created and opened with: Chroma's ONNX MiniLM."""
+        return embedding_functions.DefaultEmbeddingFunction()
+    
+    def _create_gpu_encoder(self, device: Optional[str] = None):
+        """Load all-MiniLM-L6-v2 on CUDA in FP16, or return None to encode with embedding_function.
+        
+        Both produce normalized all-MiniLM-L6-v2 vectors, and every write and query
+        passes precomputed embeddings, so Chroma never needs to know about this model.
+        """
+        try:
+            import torch
+            if device is None:
+                device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            if not device.startswith('cuda'):
+                return None
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer("all-MiniLM-L6-v2", device=device).half()
+            logger.info(f"Using GPU embeddings on {device}")
+            return model
+        except Exception as e:
+            logger.debug(f"GPU embeddings unavailable, falling back to CPU: {e}")
+            return None
+    
+    def _encode(self, texts: List[str]) -> List[Any]:
+        """Run the active encoder over texts."""
+        if self._gpu_encoder is not None:
+            return list(self._gpu_encoder.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+                        .astype(np.float32))
+        return self.embedding_function(texts)
     
     def _initialize_client(self):
         """Initialize ChromaDB client with improved error handling and performance."""
@@ -35,20 +220,17 @@ class VectorStoreManager:
             )
             
             try:
-                self.collection = self.client.get_collection(name=self.collection_name)
+                self.collection = self.client.get_collection(
+                    name=self.collection_name,
+                    embedding_function=self.embedding_function
+                )
                 count = self.collection.count()
                 logger.info(f"Loaded existing collection '{self.collection_name}' with {count} documents")
+                if count:
+                    threading.Thread(target=self._warm_up, name="vector-store-warmup", daemon=True).start()
             except Exception:
                 # Create collection with optimized configuration
-                self.collection = self.client.create_collection(
-                    name=self.collection_name,
-                    metadata={
-                        "hnsw:space": "cosine",
-                        "hnsw:search_ef": 100,  # Better search quality
-                        "hnsw:M": 16,           # More connections for better recall
-                        "description": "Enhanced document collection for Orbuculum.ai"
-                    }
-                )
+                self.collection = self._create_collection("Enhanced document collection for Orbuculum.ai")
                 logger.info(f"Created new collection '{self.collection_name}' with enhanced configuration")
             
             logger.info("Vector store initialized successfully")
@@ -57,181 +239,520 @@ class VectorStoreManager:
             logger.error(f"Failed to initialize vector store: {e}")
             raise
     
+    def _warm_up(self):
+        """Fault the persisted index into the page cache and run one query so the first search is fast."""
+        try:
+            for root, _, files in os.walk(self.persist_directory):
+                for name in files:
+                    if not (name.endswith('.bin') or name == 'chroma.sqlite3'):
+                        continue
+                    path = os.path.join(root, name)
+                    if os.path.getsize(path) == 0:
+                        continue
+                    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_WILLNEED'):
+                            mm.madvise(mmap.MADV_WILLNEED)
+                        else:
+                            # Touch one byte per page to pull the file in
+                            for offset in range(0, len(mm), mmap.PAGESIZE):
+                                mm[offset]
+            
+            # Loads the encoder and the HNSW segment; bypasses the query cache on purpose
+            self.collection.query(query_embeddings=[self._encode(["warmup"])[0]], n_results=1)
+            logger.debug("Vector store warm-up finished")
+        except Exception as e:
+            logger.debug(f"Vector store warm-up skipped: {e}")
+    
+    def _create_collection(self, description: str, name: Optional[str] = None, **extra_metadata):
+        """Create the documents collection (or a staging copy) with the shared HNSW configuration."""
+        return self.client.create_collection(
+            name=name or self.collection_name,
+            embedding_function=self.embedding_function,
+            metadata={
+                "hnsw:space": "cosine",
+                "hnsw:search_ef": 100,  # Better search quality
+                "hnsw:construction_ef": 200,  # Better graph quality, paid once at insert
+                "hnsw:M": 16,           # More connections for better recall
+                "description": description,
+                **extra_metadata
+            }
+        )
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a single query with the same model used for the collection.
+        
+        Repeated queries (after case and whitespace normalization) are served
+        from an LRU instead of running the encoder again.
+        """
+        key = _normalize_query(query)
+        with self._query_emb_lock:
+            embedding = self._query_emb_cache.get(key)
+            if embedding is not None:
+                self._query_emb_cache.move_to_end(key)
+                return embedding
+        
+        embedding = self._encode([query])[0]
+        with self._query_emb_lock:
+            self._query_emb_cache[key] = embedding
+            if len(self._query_emb_cache) > self.query_cache_size:
+                self._query_emb_cache.popitem(last=False)
+        return embedding
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed many texts in one batched encoder call."""
+        return self._encode(texts)
+    
+    def _bloom_path(self) -> str:
+        """Location of the persisted chunk-ID Bloom filter."""
+        return os.path.join(self.persist_directory, 'bloom.bin')
+    
+    def _load_bloom(self):
+        """Load the chunk-ID Bloom filter, seeding it from the collection if there is no file yet."""
+        if self.collection is None:
+            return
+        try:
+            self._bloom = _BloomFilter.load(self._bloom_path())
+            return
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not load bloom filter, rebuilding it: {e}")
+        
+        try:
+            bloom = _BloomFilter()
+            offset = 0
+            while True:
+                page = self.collection.get(include=[], limit=10000, offset=offset)['ids']
+                if not page:
+                    break
+                for doc_id in page:
+                    bloom.add(doc_id)
+                offset += len(page)
+            bloom.save(self._bloom_path())
+            self._bloom = bloom
+            logger.info(f"Seeded bloom filter with {offset} chunk IDs")
+        except Exception as e:
+            logger.warning(f"Bloom filter unavailable, falling back to collection lookups: {e}")
+            self._bloom = None
+    
+    def _save_bloom(self, force: bool = False):
+        """Persist the Bloom filter if it changed and, unless forced, the save interval has passed."""
+        with self._write_lock:
+            if self._bloom is None or not self._bloom_dirty:
+                return
+            if not force and time.monotonic() - self._bloom_saved_at < self.bloom_save_interval:
+                return
+            try:
+                self._bloom.save(self._bloom_path())
+                self._bloom_dirty = False
+                self._bloom_saved_at = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Could not save bloom filter: {e}")
+    
+    def _reset_bloom(self):
+        """Start an empty Bloom filter after the collection has been emptied."""
+        if self._bloom is None:
+            return
+        with self._write_lock:
+            self._bloom = _BloomFilter()
+            self._bloom_dirty = True
+            self._save_bloom(force=True)
+    
+    def _embedding_cache_path(self) -> str:
+        """Location of the persisted chunk embedding cache."""
+        return os.path.join(self.persist_directory, 'emb_cache.npz')
+    
+    def _load_embedding_cache(self):
+        """Load the persisted content-hash -> embedding cache, if any."""
+        try:
+            with np.load(self._embedding_cache_path()) as data:
+                keys, embs = data['keys'], data['embs']
+            for key, emb in zip(keys, embs):
+                self._emb_cache[key.tobytes()] = emb
+            logger.info(f"Loaded {len(self._emb_cache)} cached chunk embeddings")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not load embedding cache: {e}")
+    
+    def _save_embedding_cache(self, force: bool = False):
+        """Persist the embedding cache as (N, 16) uint8 keys and (N, D) float16 vectors.
+        
+        Skipped when nothing changed, and unless forced, when the last save was
+        less than emb_cache_save_interval seconds ago.
+        """
+        try:
+            with self._emb_cache_lock:
+                if not self._emb_cache_dirty or not self._emb_cache:
+                    return
+                if not force and time.monotonic() - self._emb_cache_saved_at < self.emb_cache_save_interval:
+                    return
+                keys = np.frombuffer(b''.join(self._emb_cache.keys()), dtype=np.uint8).reshape(-1, 16)
+                embs = np.stack(list(self._emb_cache.values()))
+                self._emb_cache_dirty = False
+                self._emb_cache_saved_at = time.monotonic()
+            _write_atomic(self._embedding_cache_path(), lambda f: np.savez(f, keys=keys, embs=embs))
+        except Exception as e:
+            logger.warning(f"Could not save embedding cache: {e}")
+    
+    def embed_documents_cached(self, texts: List[str]) -> List[Any]:
+        """Embed texts, reusing cached vectors for byte-identical chunks."""
+        keys = [hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest() for text in texts]
+        embeddings: List[Any] = [None] * len(texts)
+        missing = []
+        with self._emb_cache_lock:
+            for i, key in enumerate(keys):
+                cached = self._emb_cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._emb_cache.move_to_end(key)
+                    embeddings[i] = cached.astype(np.float32)
+        
+        if not missing:
+            return embeddings
+        
+        fresh = self.embed_documents([texts[i] for i in missing])
+        with self._emb_cache_lock:
+            for i, emb in zip(missing, fresh):
+                embeddings[i] = emb
+                self._emb_cache[keys[i]] = np.asarray(emb, dtype=np.float16)
+            while len(self._emb_cache) > self.emb_cache_size:
+                self._emb_cache.popitem(last=False)
+            self._emb_cache_dirty = True
+        
+        logger.debug(f"Embedded {len(missing)} chunks, reused {len(texts) - len(missing)} cached embeddings")
+        return embeddings
+    
+    def get_chunk_meta(self, doc_id: str) -> Optional[Tuple[str, str]]:
+        """Return the (source_file, snippet) pair precomputed when a chunk was added."""
+        return self._chunk_meta.get(doc_id)
+    
     def _generate_document_id(self, content: str, metadata: Dict[str, Any]) -> str:
         """Generate a unique, deterministic ID for documents."""
         source = metadata.get('source_file', metadata.get('source', 'unknown'))
         chunk_id = metadata.get('chunk_id', '')
         
         # Create a hash from content and metadata for uniqueness
-        content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()[:8]
-        source_hash = hashlib.md5(str(source).encode('utf-8')).hexdigest()[:8]
+        content_hash = hashlib.blake2b(content.encode('utf-8'), digest_size=4).hexdigest()
+        source_hash = _source_hash(str(source))
         
         return f"{source_hash}_{content_hash}_{chunk_id}"
     
-    def _clean_metadata(self, metadata: Dict[str, Any]) -> Dict[str, str]:
-        """Clean and validate metadata for ChromaDB storage."""
-        cleaned = {}
-        for key, value in metadata.items():
-            # Convert all values to strings and handle None values
-            if value is not None:
-                cleaned[str(key)] = str(value)
-            else:
-                cleaned[str(key)] = ""
+    def _clean_metadata(self, metadata: Dict[str, Any], indexed_at: Optional[str] = None) -> Dict[str, Any]:
+        """Clean and validate metadata for ChromaDB storage.
+        
+        Callers cleaning a whole batch pass one indexed_at timestamp for all of it.
+        """
+        # Chroma stores scalars natively; keep them so numeric filters still work
+        # Exact type checks first: keys and most values are already plain strings
+        cleaned = {
+            (key if type(key) is str else str(key)):
+            value if type(value) is str or isinstance(value, (int, float, bool))
+            else "" if value is None else str(value)
+            for key, value in metadata.items()
+        }
         
         # Add processing timestamp
-        cleaned['indexed_at'] = datetime.now().isoformat()
+        cleaned['indexed_at'] = indexed_at or datetime.now().isoformat()
         
         return cleaned
     
-    def add_documents(self, documents: List[Any], batch_size: int = 100) -> bool:
-        """Add documents to the vector store with improved batching and deduplication."""
+    def _prepare_document(self, doc: Any, indexed_at: Optional[str] = None) -> Optional[Tuple[str, Dict[str, Any], str]]:
+        """Extract (text, cleaned metadata, id) for one document, or None if it should be skipped."""
+        try:
+            text, metadata = _extract(doc)
+            
+            # Skip empty documents
+            if not text or len(text.strip()) < 10:
+                return None
+            
+            return text, self._clean_metadata(metadata, indexed_at), self._generate_document_id(text, metadata)
+        except Exception as e:
+            logger.error(f"Error processing document: {e}")
+            return None
+    
+    def add_documents(self, documents: List[Any], batch_size: Optional[int] = None,
+                      embeddings: Optional[List[List[float]]] = None, collection=None) -> bool:
+        """Add documents to the vector store with improved batching and deduplication.
+        
+        If given, embeddings must be aligned with documents. Otherwise every new
+        chunk is embedded in a single batched encoder call before insertion.
+        collection overrides the target collection (used when bulk loading).
+        Concurrent calls are serialized.
+        """
+        with self._write_lock:
+            return self._add_documents(documents, batch_size, embeddings, collection)
+    
+    def _add_documents(self, documents: List[Any], batch_size: Optional[int],
+                       embeddings: Optional[List[List[float]]], collection) -> bool:
+        """Body of add_documents; runs under the write lock."""
         try:
             if not documents:
                 logger.warning("No documents provided to add")
                 return True
             
-            doc_texts, metadatas, ids = [], [], []
-            added_count = 0
-            skipped_count = 0
+            target = collection or self.collection
+            indexed_at = datetime.now().isoformat()
             
-            # Get existing document IDs for deduplication
-            try:
-                existing_ids = set(self.collection.get()['ids'])
-            except Exception:
-                existing_ids = set()
+            # Phase 1: materialize (text, metadata, id) rows. This is GIL-bound hashing
+            # and dict building, so it runs serially; a thread pool only adds overhead
+            n = len(documents)
+            rows = [self._prepare_document(doc, indexed_at) for doc in documents]
             
-            for i, doc in enumerate(documents):
+            # Ask only about this call's candidate IDs, a batch at a time, instead of
+            # loading every ID (and document) in the collection. IDs the Bloom filter
+            # has never seen are definitely new and skip the lookup entirely
+            candidate_ids = list({row[2] for row in rows if row is not None})
+            bloom = self._bloom
+            if bloom is not None:
+                candidate_ids = [doc_id for doc_id in candidate_ids if doc_id in bloom]
+            existing_ids = set()
+            for id_batch in _iter_batches(candidate_ids, batch_size or self.batch_size):
                 try:
-                    text = doc.page_content if hasattr(doc, 'page_content') else str(doc)
-                    metadata = doc.metadata.copy() if hasattr(doc, 'metadata') and isinstance(doc.metadata, dict) else {}
-                    
-                    # Skip empty documents
-                    if not text or len(text.strip()) < 10:
-                        logger.debug(f"Skipping empty or very short document {i}")
-                        skipped_count += 1
-                        continue
-                    
-                    # Generate unique ID
-                    doc_id = self._generate_document_id(text, metadata)
-                    
-                    # Skip if document already exists
-                    if doc_id in existing_ids:
-                        logger.debug(f"Document {doc_id} already exists, skipping")
-                        skipped_count += 1
-                        continue
-                    
-                    cleaned_metadata = self._clean_metadata(metadata)
-                    
-                    doc_texts.append(text)
-                    metadatas.append(cleaned_metadata)
-                    ids.append(doc_id)
-                    added_count += 1
-                    
-                    # Process in batches to avoid memory issues
-                    if len(doc_texts) >= batch_size:
-                        self._add_batch(doc_texts, metadatas, ids)
-                        doc_texts, metadatas, ids = [], [], []
-                        
+                    existing_ids.update(target.get(ids=id_batch, include=[])['ids'])
                 except Exception as e:
-                    logger.error(f"Error processing document {i}: {e}")
-                    skipped_count += 1
+                    logger.warning(f"Could not check existing documents: {e}")
+            
+            # Keep rows that are valid, not stored yet and not repeated earlier in this call
+            keep = []
+            seen = set()
+            for i, row in enumerate(rows):
+                if row is None or row[2] in existing_ids or row[2] in seen:
                     continue
+                seen.add(row[2])
+                keep.append(i)
+            skipped_count = n - len(keep)
+            if skipped_count:
+                logger.debug(f"Skipping {skipped_count} empty, invalid or already stored documents")
+            
+            doc_texts = [rows[i][0] for i in keep]
+            metadatas = [rows[i][1] for i in keep]
+            ids = [rows[i][2] for i in keep]
+            doc_embeddings = [embeddings[i] for i in keep] if embeddings is not None else None
+            
+            # Phase 2: embed what's new and stream it to the collection in batches
+            if doc_texts and doc_embeddings is None:
+                # One batched encoder pass over only the chunks that will be stored
+                # and have not been embedded before
+                doc_embeddings = self.embed_documents_cached(doc_texts)
+            
+            # Insert in batches to avoid oversized requests, overlapping a few
+            # writes so SQLite commits don't serialize the whole ingest
+            batch_size = batch_size or self.batch_size
+            batches = list(zip(
+                _iter_batches(doc_texts, batch_size),
+                _iter_batches(metadatas, batch_size),
+                _iter_batches(ids, batch_size),
+                _iter_batches(doc_embeddings or [], batch_size)
+            ))
+            if len(batches) > 1 and self.concurrency > 1:
+                futures = [self._executor.submit(self._add_batch, *batch, collection=target) for batch in batches]
+                wait(futures)
+                for future in futures:
+                    if future.exception() is not None:
+                        raise future.exception()
+            else:
+                for batch in batches:
+                    self._add_batch(*batch, collection=target)
             
-            # Add remaining documents
-            if doc_texts:
-                self._add_batch(doc_texts, metadatas, ids)
+            # Record IDs once all batches landed (the bitmap isn't safe to update from the writers)
+            if bloom is not None and ids:
+                for doc_id in ids:
+                    bloom.add(doc_id)
+                self._bloom_dirty = True
             
-            logger.info(f"Successfully added {added_count} new documents, skipped {skipped_count}")
+            self._save_bloom()
+            self._save_embedding_cache()
+            logger.info(f"Successfully added {len(doc_texts)} new documents, skipped {skipped_count}")
             return True
             
         except Exception as e:
             logger.error(f"Error adding documents to vector store: {e}")
             return False
     
-    def _add_batch(self, doc_texts: List[str], metadatas: List[Dict], ids: List[str]):
-        """Add a batch of documents to the collection."""
+    def _add_batch(self, doc_texts: List[str], metadatas: List[Dict], ids: List[str],
+                   embeddings: Optional[List[List[float]]] = None, collection=None):
+        """Add a batch of documents to the collection.
+        
+        Uses upsert so a chunk that landed between the dedup check and this
+        write (concurrent uploads, retried batches) is replaced rather than
+        failing the whole batch.
+        """
         try:
-            self.collection.add(
+            (collection or self.collection).upsert(
                 documents=doc_texts,
                 metadatas=metadatas,
-                ids=ids
+                ids=ids,
+                embeddings=embeddings
             )
+            self.revision += 1
+            for doc_id, text, metadata in zip(ids, doc_texts, metadatas):
+                self._chunk_meta[doc_id] = (metadata.get('source_file', 'unknown'), text[:SNIPPET_LENGTH])
             logger.debug(f"Added batch of {len(doc_texts)} documents")
         except Exception as e:
             logger.error(f"Error adding batch: {e}")
             raise
             
-    def rebuild_from_documents(self, documents: List[Any]):
-        """Clear the collection and rebuild it from a list of documents."""
+    def bulk_load(self, documents: List[Any], embeddings: Optional[List[List[float]]] = None) -> bool:
+        """Load documents into a staging collection, then swap it in for the live one.
+        
+        Searches keep hitting the old collection until the swap, so a rebuild
+        never exposes an empty or half-filled index. The old collection is
+        renamed aside and only dropped once staging has taken its name; if the
+        rename fails it is put back. The write lock is held throughout, so no
+        other ingest or delete can land in the old collection and be lost.
+        """
+        with self._write_lock:
+            return self._bulk_load(documents, embeddings)
+    
+    def _bulk_load(self, documents: List[Any], embeddings: Optional[List[List[float]]]) -> bool:
+        """Body of bulk_load; runs under the write lock."""
+        staging_name = f"{self.collection_name}_{os.urandom(4).hex()}"
+        try:
+            staging = self._create_collection("Enhanced document collection for Orbuculum.ai", name=staging_name)
+        except Exception as e:
+            logger.error(f"Error creating staging collection: {e}")
+            return False
+        
+        if not self.add_documents(documents, embeddings=embeddings, collection=staging):
+            try:
+                self.client.delete_collection(name=staging_name)
+            except Exception as e:
+                logger.warning(f"Could not drop staging collection {staging_name}: {e}")
+            return False
+        
+        backup_name = f"{self.collection_name}_old_{os.urandom(4).hex()}"
+        try:
+            with self._swap_lock:
+                live = self.collection
+                live.modify(name=backup_name)
+                try:
+                    staging.modify(name=self.collection_name)
+                except Exception:
+                    live.modify(name=self.collection_name)
+                    raise
+                self.collection = staging
+                self.revision += 1
+                # Keep precomputed snippets only for chunks in the new collection
+                live_ids = set(staging.get(include=[])['ids'])
+                self._chunk_meta = {doc_id: meta for doc_id, meta in self._chunk_meta.items() if doc_id in live_ids}
+        except Exception as e:
+            logger.error(f"Error swapping in bulk-loaded collection: {e}")
+            try:
+                self.client.delete_collection(name=staging_name)
+            except Exception as drop_error:
+                logger.warning(f"Could not drop staging collection {staging_name}: {drop_error}")
+            return False
+        
+        try:
+            self.client.delete_collection(name=backup_name)
+        except Exception as e:
+            logger.warning(f"Could not drop old collection {backup_name}: {e}")
+        logger.info(f"Swapped in bulk-loaded collection with {staging.count()} documents")
+        return True
+    
+    def rebuild_from_documents(self, documents: List[Any], embeddings: Optional[List[List[float]]] = None):
+        """Rebuild the collection from a list of documents without a query outage."""
         logger.info("Starting collection rebuild...")
-        self._clear_collection()
-        success = self.add_documents(documents)
+        success = self.bulk_load(documents, embeddings=embeddings)
         if success:
             logger.info("Collection rebuild completed successfully")
         else:
             logger.error("Collection rebuild failed")
         return success
     
-    def _clear_collection(self):
-        """Clear all documents from the collection efficiently."""
+    def sync_documents(self, documents: List[Any]) -> bool:
+        """Bring the persisted collection in line with the given local documents.
+        
+        Chunks that are already stored are kept as-is, so only new or changed
+        chunks are embedded; local chunks no longer produced by the documents
+        (deleted files, edited content) are removed.
+        """
         try:
-            # Get all document IDs in batches
-            batch_size = 1000
-            while True:
-                result = self.collection.get(limit=batch_size)
-                if not result['ids']:
-                    break
-                    
-                self.collection.delete(ids=result['ids'])
-                logger.debug(f"Cleared batch of {len(result['ids'])} documents")
+            # Held across the stale delete and the re-add so ingests and deletes never interleave
+            with self._write_lock:
+                expected_ids = set()
+                for doc in documents:
+                    expected_ids.add(self._generate_document_id(*_extract(doc)))
                 
-                if len(result['ids']) < batch_size:
-                    break
-                    
-            logger.info("Collection cleared successfully")
+                stored = self.collection.get(where={"source_type": "local_document"}, include=[])
+                stale_ids = [doc_id for doc_id in stored['ids'] if doc_id not in expected_ids]
+                if stale_ids:
+                    self.collection.delete(ids=stale_ids)
+                    self.revision += 1
+                    for doc_id in stale_ids:
+                        self._chunk_meta.pop(doc_id, None)
+                    logger.info(f"Removed {len(stale_ids)} stale document chunks")
+                
+                return self.add_documents(documents)
+            
+        except Exception as e:
+            logger.error(f"Error syncing documents: {e}")
+            return False
+    
+    def _clear_collection(self):
+        """Clear all documents by dropping and recreating the collection."""
+        try:
+            count = self.collection.count()
+            try:
+                # Dropping the collection removes its tables and HNSW segment in one call,
+                # instead of paging every id out and sending it back in delete()
+                self.client.delete_collection(name=self.collection_name)
+            except Exception as e:
+                # e.g. clients without permission to drop collections
+                logger.warning(f"Could not drop collection, deleting in batches instead: {e}")
+                self._delete_all_batched()
+            else:
+                self.collection = self._create_collection("Enhanced document collection for Orbuculum.ai")
+            self.revision += 1
+            self._chunk_meta.clear()
+            self._reset_bloom()
+            logger.info(f"Collection cleared successfully ({count} documents removed)")
         except Exception as e:
             logger.warning(f"Error clearing collection: {e}")
     
-    def similarity_search(self, query: str, k: int = 4, score_threshold: float = 0.7) -> List[Dict[str, Any]]:
-        """Enhanced similarity search with filtering and better relevance scoring."""
+    def _delete_all_batched(self, batch_size: int = 1000):
+        """Delete every document page by page; fallback for when the collection can't be dropped."""
+        while True:
+            batch_ids = self.collection.get(limit=batch_size, include=[])['ids']
+            if not batch_ids:
+                break
+            self.collection.delete(ids=batch_ids)
+            logger.debug(f"Cleared batch of {len(batch_ids)} documents")
+    
+    def similarity_search(self, query: str, k: int = 4, score_threshold: float = 0.7,
+                          query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Enhanced similarity search with filtering and better relevance scoring.
+        
+        Pass query_embedding when the caller already embedded the query to skip
+        a second encoder pass.
+        """
         try:
-            if not self.collection:
+            # One snapshot for the whole search, so a bulk-load swap can't split it across collections
+            collection = self.collection
+            if not collection:
                 logger.error("Collection not initialized")
                 return []
             
             # Increase search results to allow for filtering
             search_k = min(k * 2, 20)
             
-            results = self.collection.query(
-                query_texts=[query], 
-                n_results=search_k,
-                include=['documents', 'metadatas', 'distances']
-            )
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc_text in enumerate(results['documents'][0]):
-                    distance = results['distances'][0][i] if results['distances'] and results['distances'][0] else 1.0
-                    similarity = 1 - distance  # Convert distance to similarity
-                    
-                    # Filter by relevance threshold
-                    if similarity < (1 - score_threshold):
-                        continue
-                    
-                    metadata = results['metadatas'][0][i] if results['metadatas'] and results['metadatas'][0] else {}
-                    
-                    result = {
-                        'page_content': doc_text,
-                        'metadata': metadata,
-                        'score': distance,
-                        'similarity': similarity,
-                        'relevance_score': self._calculate_relevance_score(doc_text, query, similarity)
-                    }
-                    formatted_results.append(result)
-            
-            # Sort by relevance score and limit results
-            formatted_results.sort(key=lambda x: x['relevance_score'], reverse=True)
-            formatted_results = formatted_results[:k]
+            results = self._flat_query(collection, query_embedding, search_k)
+            if results is None:
+                results = collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=search_k,
+                    include=['documents', 'metadatas', 'distances']
+                )
+            
+            # Keep the k most relevant straight off the generator, without
+            # materializing or sorting the whole candidate list
+            formatted_results = heapq.nlargest(k, self._iter_results(results, query, score_threshold),
+                                               key=lambda x: x['relevance_score'])
             
             logger.info(f"Found {len(formatted_results)} relevant documents for query (threshold: {score_threshold})")
             return formatted_results
@@ -240,14 +761,90 @@ class VectorStoreManager:
             logger.error(f"Error in similarity search: {e}")
             return []
     
-    def _calculate_relevance_score(self, document: str, query: str, similarity: float) -> float:
-        """Calculate enhanced relevance score considering multiple factors."""
+    def _iter_results(self, results: Dict[str, Any], query: str, score_threshold: float):
+        """Yield formatted hits from a collection.query result that pass the relevance threshold."""
+        docs = results['documents'][0] if results['documents'] else []
+        if not docs:
+            return
+        ids = results['ids'][0]
+        metas = results['metadatas'][0] if results['metadatas'] and results['metadatas'][0] else None
+        dists = results['distances'][0] if results['distances'] and results['distances'][0] else None
+        min_similarity = 1 - score_threshold
+        score = self._calculate_relevance_score
+        query_words = frozenset(query.lower().split())
+        
+        for i, doc_text in enumerate(docs):
+            distance = dists[i] if dists is not None else 1.0
+            similarity = 1 - distance  # Convert distance to similarity
+            
+            # Filter by relevance threshold
+            if similarity < min_similarity:
+                continue
+            
+            yield {
+                'id': ids[i],
+                'page_content': doc_text,
+                'metadata': metas[i] if metas is not None else {},
+                'score': distance,
+                'similarity': similarity,
+                'relevance_score': score(doc_text, query_words, similarity)
+            }
+    
+    def _flat_matrix(self, collection) -> Optional[Tuple[List[str], np.ndarray]]:
+        """Return (ids, unit-norm embedding matrix) for small collections, rebuilt after writes."""
+        with self._flat_lock:
+            # Keyed on the collection too, so a search still holding the pre-swap
+            # collection can't cache its matrix under the post-swap revision
+            key = (self.revision, id(collection))
+            if self._flat_key != key:
+                self._flat = None
+                count = collection.count() or 0
+                if 0 < count <= self.flat_scan_max:
+                    data = collection.get(include=['embeddings'])
+                    matrix = np.asarray(data['embeddings'], dtype=np.float32)
+                    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+                    self._flat = (list(data['ids']), matrix)
+                self._flat_key = key
+            return self._flat
+    
+    def _flat_query(self, collection, query_embedding, n_results: int) -> Optional[Dict[str, List[List[Any]]]]:
+        """Exact cosine search by one matrix-vector product, shaped like a collection.query result.
+        
+        Returns None when the collection is too large (or empty) so the caller
+        falls back to the HNSW index.
+        """
+        flat = self._flat_matrix(collection)
+        if flat is None:
+            return None
+        ids, matrix = flat
+        
+        query_vec = np.asarray(query_embedding, dtype=np.float32)
+        scores = matrix @ (query_vec / max(float(np.linalg.norm(query_vec)), 1e-12))
+        n_results = min(n_results, len(ids))
+        top = np.argpartition(-scores, n_results - 1)[:n_results]
+        top = top[np.argsort(-scores[top])]
+        
+        payload = collection.get(ids=[ids[i] for i in top], include=['documents', 'metadatas'])
+        by_id = {doc_id: (doc, metadata) for doc_id, doc, metadata
+                 in zip(payload['ids'], payload['documents'], payload['metadatas'])}
+        hits = [(ids[i], 1.0 - float(scores[i])) for i in top if ids[i] in by_id]
+        return {
+            'ids': [[doc_id for doc_id, _ in hits]],
+            'documents': [[by_id[doc_id][0] for doc_id, _ in hits]],
+            'metadatas': [[by_id[doc_id][1] for doc_id, _ in hits]],
+            'distances': [[distance for _, distance in hits]]
+        }
+    
+    def _calculate_relevance_score(self, document: str, query_words: frozenset, similarity: float) -> float:
+        """Calculate enhanced relevance score considering multiple factors.
+        
+        query_words is the query's lower-cased token set, tokenized once per search.
+        """
         base_score = similarity
         
-        # Boost score for exact keyword matches
-        query_words = set(query.lower().split())
-        doc_words = set(document.lower().split())
-        keyword_overlap = len(query_words.intersection(doc_words)) / len(query_words) if query_words else 0
+        # Boost score for exact keyword matches; intersecting with the token stream
+        # avoids building a set of every word in the document
+        keyword_overlap = len(query_words.intersection(document.lower().split())) / len(query_words) if query_words else 0
         
         # Boost score for document length (longer documents might be more informative)
         length_factor = min(len(document) / 500, 1.2)  # Cap at 20% boost
@@ -257,16 +854,33 @@ class VectorStoreManager:
         
         return min(relevance_score, 1.0)
     
+    def _cached_stats(self, key: str, compute) -> Dict[str, Any]:
+        """Return compute()'s result, reusing it until the next write or for stats_cache_ttl seconds."""
+        entry = self._stats_cache.get(key)
+        if entry is not None and entry[0] == self.revision and time.monotonic() - entry[1] < self.stats_cache_ttl:
+            return entry[2]
+        
+        revision = self.revision
+        result = compute()
+        if 'error' not in result:
+            self._stats_cache[key] = (revision, time.monotonic(), result)
+        return result
+    
     def get_collection_info(self) -> Dict[str, Any]:
         """Get comprehensive information about the collection."""
+        return self._cached_stats('info', self._collection_info)
+    
+    def _collection_info(self) -> Dict[str, Any]:
+        """Compute the collection summary behind get_collection_info."""
         try:
-            if not self.collection:
+            collection = self.collection
+            if not collection:
                 return {'count': 0, 'error': 'Collection not initialized'}
             
-            count = self.collection.count()
+            count = collection.count() or 0
             
-            # Get sample documents to analyze metadata
-            sample = self.collection.get(limit=10)
+            # Get sample metadata only; the documents and ids aren't needed here
+            sample = collection.get(limit=10, include=['metadatas'])
             
             source_types = set()
             source_files = set()
@@ -293,23 +907,23 @@ class VectorStoreManager:
     def delete_by_source(self, source_filename: str) -> bool:
         """Delete documents by source filename with improved efficiency."""
         try:
-            if not self.collection:
-                return False
-            
-            # Find documents matching the source
-            results = self.collection.get(
-                where={"source_file": source_filename},
-                include=['ids']
-            )
-            
-            if results['ids']:
-                self.collection.delete(ids=results['ids'])
-                logger.info(f"Deleted {len(results['ids'])} documents with source: {source_filename}")
-                return True
-            else:
-                logger.info(f"No documents found with source: {source_filename}")
-                return True
+            # Ingest workers fill _chunk_meta concurrently; the lock keeps the prune scan safe
+            with self._write_lock:
+                if not self.collection:
+                    return False
+                
+                # Match and delete server-side in one call, without pulling the ids over
+                self.collection.delete(where={"source_file": source_filename})
+                self.revision += 1
+                
+                # The snippet map is keyed by id, so prune it by the source it records
+                stale_ids = [doc_id for doc_id, (source, _) in self._chunk_meta.items() if source == source_filename]
+                for doc_id in stale_ids:
+                    self._chunk_meta.pop(doc_id, None)
                 
+                logger.info(f"Deleted documents with source: {source_filename}")
+                return True
+            
         except Exception as e:
             logger.error(f"Error deleting documents by source: {e}")
             return False
@@ -325,16 +939,13 @@ class VectorStoreManager:
                 logger.warning(f"Could not delete collection (might not exist): {e}")
             
             # Create new collection with enhanced settings
-            self.collection = self.client.create_collection(
-                name=self.collection_name,
-                metadata={
-                    "hnsw:space": "cosine",
-                    "hnsw:search_ef": 100,
-                    "hnsw:M": 16,
-                    "description": "Reset enhanced document collection for Orbuculum.ai",
-                    "reset_at": datetime.now().isoformat()
-                }
+            self.collection = self._create_collection(
+                "Reset enhanced document collection for Orbuculum.ai",
+                reset_at=datetime.now().isoformat()
             )
+            self.revision += 1
+            self._chunk_meta.clear()
+            self._reset_bloom()
             logger.info("Collection reset successfully with enhanced configuration")
             return True
             
@@ -345,30 +956,33 @@ class VectorStoreManager:
     def search_with_filters(self, query: str, filters: Dict[str, str] = None, k: int = 4) -> List[Dict[str, Any]]:
         """Search with metadata filters for more precise results."""
         try:
-            if not self.collection:
+            collection = self.collection
+            if not collection:
                 logger.error("Collection not initialized")
                 return []
             
-            results = self.collection.query(
-                query_texts=[query],
+            results = collection.query(
+                query_embeddings=[self.embed_query(query)],
                 n_results=k,
-                where=filters or {},
+                # An empty where clause is rejected by Chroma; None means unfiltered
+                where=filters or None,
                 include=['documents', 'metadatas', 'distances']
             )
             
-            formatted_results = []
-            if results['documents'] and results['documents'][0]:
-                for i, doc_text in enumerate(results['documents'][0]):
-                    distance = results['distances'][0][i] if results['distances'] and results['distances'][0] else 1.0
-                    metadata = results['metadatas'][0][i] if results['metadatas'] and results['metadatas'][0] else {}
-                    
-                    result = {
-                        'page_content': doc_text,
-                        'metadata': metadata,
-                        'score': distance,
-                        'similarity': 1 - distance
-                    }
-                    formatted_results.append(result)
+            docs = results['documents'][0] if results['documents'] else []
+            metas = results['metadatas'][0] if results['metadatas'] and results['metadatas'][0] else None
+            dists = results['distances'][0] if results['distances'] and results['distances'][0] else None
+            
+            # Result count is known up front, so fill a pre-sized list
+            formatted_results = [None] * len(docs)
+            for i, doc_text in enumerate(docs):
+                distance = dists[i] if dists is not None else 1.0
+                formatted_results[i] = {
+                    'page_content': doc_text,
+                    'metadata': metas[i] if metas is not None else {},
+                    'score': distance,
+                    'similarity': 1 - distance
+                }
             
             logger.info(f"Found {len(formatted_results)} filtered documents for query")
             return formatted_results
@@ -379,30 +993,41 @@ class VectorStoreManager:
     
     def get_document_stats(self) -> Dict[str, Any]:
         """Get detailed statistics about the document collection."""
+        return self._cached_stats('stats', self._document_stats)
+    
+    def _document_stats(self, page_size: int = 1000) -> Dict[str, Any]:
+        """Count chunks per source and type, paging through metadata so only the counts are kept."""
         try:
-            if not self.collection:
+            collection = self.collection
+            if not collection:
                 return {'error': 'Collection not initialized'}
             
-            # Get all documents (in batches if collection is large)
-            all_docs = self.collection.get(include=['metadatas'])
-            
-            if not all_docs['metadatas']:
-                return {'total_documents': 0, 'sources': {}, 'types': {}}
-            
             sources = {}
             types = {}
+            total = 0
             
-            for metadata in all_docs['metadatas']:
-                # Count by source
-                source = metadata.get('source_file', metadata.get('source', 'unknown'))
-                sources[source] = sources.get(source, 0) + 1
+            offset = 0
+            while True:
+                page = collection.get(include=['metadatas'], limit=page_size, offset=offset)['metadatas']
+                if not page:
+                    break
+                offset += len(page)
+                total += len(page)
                 
-                # Count by type
-                doc_type = metadata.get('source_type', 'unknown')
-                types[doc_type] = types.get(doc_type, 0) + 1
+                for metadata in page:
+                    # Count by source
+                    source = metadata.get('source_file', metadata.get('source', 'unknown'))
+                    sources[source] = sources.get(source, 0) + 1
+                    
+                    # Count by type
+                    doc_type = metadata.get('source_type', 'unknown')
+                    types[doc_type] = types.get(doc_type, 0) + 1
+            
+            if not total:
+                return {'total_documents': 0, 'sources': {}, 'types': {}}
             
             return {
-                'total_documents': len(all_docs['metadatas']),
+                'total_documents': total,
                 'unique_sources': len(sources),
                 'sources': sources,
                 'types': types,
@@ -0,0 +1,427 @@
+import hnswlib
+import numpy as np
+import os
+import json
+import logging
+import sqlite3
+import threading
+import heapq
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+
+from .vector_store import VectorStoreManager, SNIPPET_LENGTH, _extract, _iter_batches
+
+logger = logging.getLogger(__name__)
+
+CHUNKS_SCHEMA = ("(label INTEGER PRIMARY KEY, id TEXT UNIQUE, source_file TEXT, "
+                 "source_type TEXT, document TEXT, metadata TEXT)")
+# IDs per "WHERE id IN (...)" lookup, under SQLite's bound-parameter limit
+SQLITE_BATCH = 500
+
+class HnswlibVectorStore(VectorStoreManager):
+    """In-memory hnswlib index with chunk payloads mirrored in SQLite.
+    
+    Drop-in replacement for VectorStoreManager (select it with
+    VECTOR_BACKEND=hnswlib). Embedding, ID and metadata handling are
+    inherited; only storage and search are replaced.
+    """
+    
+    def __init__(self, persist_directory: str = "./hnsw_db", embedding_device: Optional[str] = None,
+                 batch_size: int = 256, concurrency: int = 2):
+        self.index = None
+        self.dim = None
+        self._db = None
+        self._index_lock = threading.RLock()
+        self._next_label = 0
+        super().__init__(persist_directory, embedding_device, batch_size, concurrency)
+    
+    def _initialize_client(self):
+        """Open the payload database and load (or create) the HNSW index."""
+        try:
+            os.makedirs(self.persist_directory, exist_ok=True)
+            self._index_path = os.path.join(self.persist_directory, 'index.bin')
+            
+            self._db = sqlite3.connect(os.path.join(self.persist_directory, 'chunks.sqlite3'),
+                                       check_same_thread=False)
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS chunks {CHUNKS_SCHEMA}")
+            self._db.execute("CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source_file)")
+            self._db.commit()
+            
+            self.dim = len(self._encode(["dimension probe"])[0])
+            self.index = hnswlib.Index(space='cosine', dim=self.dim)
+            if os.path.exists(self._index_path):
+                self.index.load_index(self._index_path, allow_replace_deleted=True)
+                logger.info(f"Loaded HNSW index with {self.count()} documents")
+            else:
+                self._init_index()
+                logger.info("Created new HNSW index")
+            
+            max_label = self._db.execute("SELECT MAX(label) FROM chunks").fetchone()[0]
+            self._next_label = 0 if max_label is None else max_label + 1
+            
+            logger.info("Vector store initialized successfully")
+        
+        except Exception as e:
+            logger.error(f"Failed to initialize vector store: {e}")
+            raise
+    
+    def _init_index(self, max_elements: int = 1024):
+        """Create an empty index with the same graph parameters as the Chroma collection."""
+        self.index = hnswlib.Index(space='cosine', dim=self.dim)
+        self.index.init_index(max_elements=max_elements, ef_construction=200, M=16,
+                              allow_replace_deleted=True)
+    
+    def _persist(self):
+        """Flush the index file and the payload transaction."""
+        self.index.save_index(self._index_path)
+        self._db.commit()
+    
+    def count(self) -> int:
+        """Number of live chunks."""
+        with self._index_lock:
+            return self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+    
+    def _add_documents(self, documents: List[Any], batch_size: Optional[int],
+                       embeddings: Optional[List[List[float]]], collection) -> bool:
+        """Add documents to the index, skipping chunks that are already stored.
+        
+        Runs under the inherited write lock. Rows are inserted before their
+        vectors, in one transaction that is rolled back if the index update
+        fails, so the graph never holds labels without a payload row.
+        """
+        try:
+            if not documents:
+                logger.warning("No documents provided to add")
+                return True
+            
+            indexed_at = datetime.now().isoformat()
+            rows = [self._prepare_document(doc, indexed_at) for doc in documents]
+            
+            # Look up only this call's candidate IDs instead of every stored ID
+            candidate_ids = list({row[2] for row in rows if row is not None})
+            existing_ids = set()
+            with self._index_lock:
+                for id_batch in _iter_batches(candidate_ids, SQLITE_BATCH):
+                    placeholders = ','.join('?' * len(id_batch))
+                    existing_ids.update(row[0] for row in self._db.execute(
+                        f"SELECT id FROM chunks WHERE id IN ({placeholders})", id_batch))
+            
+            doc_texts, metadatas, ids, doc_embeddings = [], [], [], []
+            seen = set()
+            for i, row in enumerate(rows):
+                if row is None or row[2] in existing_ids or row[2] in seen:
+                    continue
+                seen.add(row[2])
+                doc_texts.append(row[0])
+                metadatas.append(row[1])
+                ids.append(row[2])
+                if embeddings is not None:
+                    doc_embeddings.append(embeddings[i])
+            
+            if not doc_texts:
+                logger.info(f"Successfully added 0 new documents, skipped {len(documents)}")
+                return True
+            
+            if embeddings is None:
+                doc_embeddings = self.embed_documents_cached(doc_texts)
+            vectors = np.asarray(doc_embeddings, dtype=np.float32)
+            
+            with self._index_lock:
+                labels = np.arange(self._next_label, self._next_label + len(ids))
+                try:
+                    self._db.executemany(
+                        "INSERT INTO chunks (label, id, source_file, source_type, document, metadata) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [(int(label), doc_id, metadata.get('source_file'), metadata.get('source_type'),
+                          text, json.dumps(metadata))
+                         for label, doc_id, text, metadata in zip(labels, ids, doc_texts, metadatas)]
+                    )
+                    needed = self.index.get_current_count() + len(ids)
+                    if needed > self.index.get_max_elements():
+                        self.index.resize_index(max(needed, 2 * self.index.get_max_elements()))
+                    self.index.add_items(vectors, labels, num_threads=os.cpu_count() or 1)
+                except Exception:
+                    self._db.rollback()
+                    raise
+                self._next_label += len(ids)
+                self._persist()
+                self.revision += 1
+                for doc_id, text, metadata in zip(ids, doc_texts, metadatas):
+                    self._chunk_meta[doc_id] = (metadata.get('source_file', 'unknown'), text[:SNIPPET_LENGTH])
+            
+            self._save_embedding_cache()
+            logger.info(f"Successfully added {len(ids)} new documents, skipped {len(documents) - len(ids)}")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error adding documents to vector store: {e}")
+            return False
+    
+    def _delete_labels(self, rows: List[tuple]):
+        """Remove (label, id) rows from the index and the payload table."""
+        for label, doc_id in rows:
+            self.index.mark_deleted(label)
+            self._chunk_meta.pop(doc_id, None)
+        self._db.executemany("DELETE FROM chunks WHERE label = ?", [(label,) for label, _ in rows])
+        self._persist()
+        self.revision += 1
+    
+    def _bulk_load(self, documents: List[Any], embeddings: Optional[List[List[float]]]) -> bool:
+        """Build a replacement index and payload table aside, then swap them in.
+        
+        Runs under the inherited write lock. Searches keep using the current
+        index until the swap, and a failed build leaves it untouched.
+        """
+        try:
+            indexed_at = datetime.now().isoformat()
+            texts, metadatas, ids, vectors = [], [], [], []
+            seen = set()
+            for i, doc in enumerate(documents):
+                row = self._prepare_document(doc, indexed_at)
+                if row is None or row[2] in seen:
+                    continue
+                seen.add(row[2])
+                texts.append(row[0])
+                metadatas.append(row[1])
+                ids.append(row[2])
+                if embeddings is not None:
+                    vectors.append(embeddings[i])
+            if embeddings is None:
+                vectors = self.embed_documents_cached(texts) if texts else []
+            
+            index = hnswlib.Index(space='cosine', dim=self.dim)
+            index.init_index(max_elements=max(len(ids), 1024), ef_construction=200, M=16,
+                             allow_replace_deleted=True)
+            if ids:
+                index.add_items(np.asarray(vectors, dtype=np.float32), np.arange(len(ids)),
+                                num_threads=os.cpu_count() or 1)
+            tmp_path = f"{self._index_path}.tmp"
+            index.save_index(tmp_path)
+            
+            with self._index_lock:
+                self._db.execute("DROP TABLE IF EXISTS chunks_staging")
+                self._db.execute(f"CREATE TABLE chunks_staging {CHUNKS_SCHEMA}")
+                self._db.executemany(
+                    "INSERT INTO chunks_staging (label, id, source_file, source_type, document, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(label, doc_id, metadata.get('source_file'), metadata.get('source_type'),
+                      text, json.dumps(metadata))
+                     for label, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas))]
+                )
+                self._db.commit()
+                
+                # Swap the table in one transaction; the index file is renamed in just before commit
+                self._db.execute("BEGIN")
+                try:
+                    self._db.execute("DROP TABLE chunks")
+                    self._db.execute("ALTER TABLE chunks_staging RENAME TO chunks")
+                    self._db.execute("CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source_file)")
+                    os.replace(tmp_path, self._index_path)
+                    self._db.commit()
+                except Exception:
+                    self._db.rollback()
+                    raise
+                
+                self.index = index
+                self._next_label = len(ids)
+                self.revision += 1
+                self._chunk_meta = {doc_id: (metadata.get('source_file', 'unknown'), text[:SNIPPET_LENGTH])
+                                    for doc_id, text, metadata in zip(ids, texts, metadatas)}
+            
+            self._save_embedding_cache()
+            logger.info(f"Swapped in bulk-loaded index with {len(ids)} documents")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error bulk loading index: {e}")
+            with self._index_lock:
+                try:
+                    self._db.execute("DROP TABLE IF EXISTS chunks_staging")
+                    self._db.commit()
+                except Exception as drop_error:
+                    logger.warning(f"Could not drop staging table: {drop_error}")
+            if os.path.exists(f"{self._index_path}.tmp"):
+                os.remove(f"{self._index_path}.tmp")
+            return False
+    
+    def sync_documents(self, documents: List[Any]) -> bool:
+        """Bring the index in line with the given local documents."""
+        try:
+            expected_ids = set()
+            for doc in documents:
+                expected_ids.add(self._generate_document_id(*_extract(doc)))
+            
+            # Held across the stale delete and the re-add so ingests and deletes never interleave
+            with self._write_lock:
+                with self._index_lock:
+                    stale = [(label, doc_id) for label, doc_id in self._db.execute(
+                        "SELECT label, id FROM chunks WHERE source_type = 'local_document'")
+                             if doc_id not in expected_ids]
+                    if stale:
+                        self._delete_labels(stale)
+                        logger.info(f"Removed {len(stale)} stale document chunks")
+                
+                return self.add_documents(documents)
+        
+        except Exception as e:
+            logger.error(f"Error syncing documents: {e}")
+            return False
+    
+    def _clear_collection(self):
+        """Clear all documents."""
+        self.reset_collection()
+    
+    def reset_collection(self):
+        """Drop every chunk and start from an empty index."""
+        try:
+            with self._write_lock, self._index_lock:
+                self._db.execute("DELETE FROM chunks")
+                self._init_index()
+                self._next_label = 0
+                self._persist()
+                self.revision += 1
+                self._chunk_meta.clear()
+            logger.info("Collection reset successfully")
+            return True
+        except Exception as e:
+            logger.error(f"Error resetting collection: {e}")
+            return False
+    
+    def _knn(self, query_embedding, k: int, filter_fn=None, ef_search: Optional[int] = None) -> List[tuple]:
+        """Return (id, document, metadata, distance) for the k nearest live chunks."""
+        with self._index_lock:
+            k = min(k, self.count())
+            if k == 0:
+                return []
+            # hnswlib needs ef >= k
+            self.index.set_ef(max(k * 4, 64) if ef_search is None else max(ef_search, k))
+            labels, distances = self.index.knn_query(np.asarray(query_embedding, dtype=np.float32),
+                                                     k=k, filter=filter_fn)
+            labels, distances = labels[0].tolist(), distances[0].tolist()
+            
+            placeholders = ','.join('?' * len(labels))
+            rows = {label: (doc_id, document, metadata) for label, doc_id, document, metadata in self._db.execute(
+                f"SELECT label, id, document, metadata FROM chunks WHERE label IN ({placeholders})", labels)}
+        
+        return [(rows[label][0], rows[label][1], json.loads(rows[label][2]), distance)
+                for label, distance in zip(labels, distances) if label in rows]
+    
+    def similarity_search(self, query: str, k: int = 4, score_threshold: float = 0.7,
+                          query_embedding: Optional[List[float]] = None,
+                          ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Nearest-neighbour search with the same filtering and scoring as the Chroma store.
+        
+        ef_search sets the HNSW search breadth for this query only (e.g. 40 for
+        cheap lookups, 200 for high recall); the index lock keeps it per-call.
+        """
+        try:
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
+            
+            query_words = frozenset(query.lower().split())
+            formatted_results = []
+            for doc_id, doc_text, metadata, distance in self._knn(query_embedding, min(k * 2, 20), ef_search=ef_search):
+                similarity = 1 - distance
+                if similarity < (1 - score_threshold):
+                    continue
+                formatted_results.append({
+                    'id': doc_id,
+                    'page_content': doc_text,
+                    'metadata': metadata,
+                    'score': distance,
+                    'similarity': similarity,
+                    'relevance_score': self._calculate_relevance_score(doc_text, query_words, similarity)
+                })
+            
+            formatted_results = heapq.nlargest(k, formatted_results, key=lambda x: x['relevance_score'])
+            
+            logger.info(f"Found {len(formatted_results)} relevant documents for query (threshold: {score_threshold})")
+            return formatted_results
+        
+        except Exception as e:
+            logger.error(f"Error in similarity search: {e}")
+            return []
+    
+    def search_with_filters(self, query: str, filters: Dict[str, str] = None, k: int = 4) -> List[Dict[str, Any]]:
+        """Search restricted to chunks whose metadata matches every filter."""
+        try:
+            filter_fn = None
+            if filters:
+                with self._index_lock:
+                    allowed = {label for label, metadata in self._db.execute("SELECT label, metadata FROM chunks")
+                               if all(json.loads(metadata).get(key) == value for key, value in filters.items())}
+                if not allowed:
+                    return []
+                filter_fn = allowed.__contains__
+                k = min(k, len(allowed))
+            
+            formatted_results = [
+                {'page_content': doc_text, 'metadata': metadata, 'score': distance, 'similarity': 1 - distance}
+                for _, doc_text, metadata, distance in self._knn(self.embed_query(query), k, filter_fn)
+            ]
+            logger.info(f"Found {len(formatted_results)} filtered documents for query")
+            return formatted_results
+        
+        except Exception as e:
+            logger.error(f"Error in filtered search: {e}")
+            return []
+    
+    def delete_by_source(self, source_filename: str) -> bool:
+        """Delete every chunk that came from the given file."""
+        try:
+            with self._write_lock, self._index_lock:
+                rows = self._db.execute("SELECT label, id FROM chunks WHERE source_file = ?",
+                                        (source_filename,)).fetchall()
+                if rows:
+                    self._delete_labels(rows)
+            logger.info(f"Deleted {len(rows)} documents with source: {source_filename}")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting documents by source: {e}")
+            return False
+    
+    def get_collection_info(self) -> Dict[str, Any]:
+        """Get comprehensive information about the index."""
+        try:
+            with self._index_lock:
+                count = self.count()
+                source_types = [row[0] or 'unknown' for row in self._db.execute(
+                    "SELECT DISTINCT source_type FROM chunks")]
+                source_files = [row[0] or 'unknown' for row in self._db.execute(
+                    "SELECT DISTINCT source_file FROM chunks")]
+            
+            return {
+                'count': count,
+                'name': self.collection_name,
+                'persist_directory': self.persist_directory,
+                'source_types': source_types,
+                'unique_sources': len(source_files),
+                'sample_sources': source_files[:5],
+                'last_updated': datetime.now().isoformat()
+            }
+        
+        except Exception as e:
+            logger.error(f"Error getting collection info: {e}")
+            return {'count': 0, 'error': str(e)}
+    
+    def get_document_stats(self) -> Dict[str, Any]:
+        """Get detailed statistics about the indexed chunks."""
+        try:
+            with self._index_lock:
+                sources = dict(self._db.execute(
+                    "SELECT COALESCE(source_file, 'unknown'), COUNT(*) FROM chunks GROUP BY 1"))
+                types = dict(self._db.execute(
+                    "SELECT COALESCE(source_type, 'unknown'), COUNT(*) FROM chunks GROUP BY 1"))
+            
+            return {
+                'total_documents': sum(sources.values()),
+                'unique_sources': len(sources),
+                'sources': sources,
+                'types': types,
+                'collection_name': self.collection_name,
+                'generated_at': datetime.now().isoformat()
+            }
+        
+        except Exception as e:
+            logger.error(f"Error getting document stats: {e}")
+            return {'error': str(e)}
@@ -1,44 +1,115 @@
-from typing import List, Dict, Any
-from langchain_community.tools import DuckDuckGoSearchResults
+from typing import List, Dict, Any, Optional
 from langchain.schema import Document
 import requests
-from bs4 import BeautifulSoup
 import logging
-import json
 import re
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+_WS_RE = re.compile(r'\s+')
+# Only the first MAX_TEXT_CHARS characters of text are kept, so never read more than this much HTML
+MAX_TEXT_CHARS = 5000
+MAX_PAGE_BYTES = 512 * 1024
+
+# Shared session so repeated fetches reuse pooled keep-alive connections (no new TCP/TLS handshake)
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Encoding': 'gzip, deflate'
+})
+# Enough pooled connections for the fetch pool's workers across many hosts
+_ADAPTER = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+# Content types worth parsing; a missing header is treated as HTML
+_TEXT_TYPES = ('html', 'xml', 'text/plain')
+# One "snippet: ..., title: ..., link: ..." entry of DuckDuckGoSearchResults output
+_RESULT_RE = re.compile(r'snippet: (.*?),\s*title: (.*?),\s*link: (.*?)(?:,|$)')
+
+@lru_cache(maxsize=4096)
+def _extract_domain(url: str) -> str:
+    """Return a URL's host, lowercased and without a leading www. ("" if it has none)."""
+    try:
+        domain = urlparse(url).netloc.lower()
+    except ValueError:  # e.g. an unbalanced IPv6 bracket
+        return ""
+    return domain[4:] if domain.startswith('www.') else domain
+
 class WebSearcher:
     def __init__(self):
+        # Imported here so loading the module doesn't pull in langchain_community's tool registry
+        from langchain_community.tools import DuckDuckGoSearchResults
         self.search_tool = DuckDuckGoSearchResults()
+        # Long-lived pool for page fetches; one worker per host at a time (see fetch_webpages)
+        self._fetch_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="web-fetch")
+
+        # Bounded LRU + TTL caches so a long-running process doesn't grow without limit.
+        # Fetches run on pool threads, so both caches are guarded by one lock.
+        self._cache_lock = threading.Lock()
+        self._search_cache: OrderedDict = OrderedDict()
+        self.search_cache_size = 512
+        self.search_cache_ttl = 3600
+        self._content_cache: OrderedDict = OrderedDict()
+        self.content_cache_size = 2048
+        self.content_cache_ttl = 86400
+
+    def _cache_get(self, cache: OrderedDict, key, ttl: float) -> Optional[Any]:
+        """Return a cached value that is younger than ttl seconds, refreshing its LRU position."""
+        with self._cache_lock:
+            entry = cache.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > ttl:
+                del cache[key]
+                return None
+            cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, cache: OrderedDict, key, value: Any, size: int):
+        """Cache a value, evicting the least recently used entries beyond size."""
+        with self._cache_lock:
+            cache[key] = (time.monotonic(), value)
+            cache.move_to_end(key)
+            while len(cache) > size:
+                cache.popitem(last=False)
 
     def search_web(self, query: str, num_results: int = 5) -> List[Dict[str, str]]:
         """Search the web and return structured results."""
+        cache_key = (query, num_results)
+        cached = self._cache_get(self._search_cache, cache_key, self.search_cache_ttl)
+        if cached is not None:
+            return [dict(result) for result in cached]
+
         try:
             results_str = self.search_tool.run(query)
             logger.info(f"Raw search results: {results_str}")
 
-            # Use regex to parse the string into a list of dictionaries
-            results = []
-            for item in re.findall(r'snippet: (.*?),\s*title: (.*?),\s*link: (.*?)(?:,|$)', results_str):
-                results.append({
-                    "snippet": item[0],
-                    "title": item[1],
-                    "link": item[2]
-                })
-
+            # Parse entries straight into result dicts, stopping once num_results are found
             search_results = []
-            for item in results[:num_results]:
+            for match in _RESULT_RE.finditer(results_str):
+                if len(search_results) >= num_results:
+                    break
+                snippet, title, link = match.groups()
                 search_results.append({
-                    'content': item.get('snippet', 'No snippet available.'),
-                    'source': item.get('link', 'No link available'),
-                    'title': item.get('title', 'No title'),
+                    'content': snippet,
+                    'source': link,
+                    'title': title,
                     'query': query
                 })
 
             logger.info(f"Found {len(search_results)} web search results")
-            return search_results
+            if search_results:
+                self._cache_put(self._search_cache, cache_key, search_results, self.search_cache_size)
+            return [dict(result) for result in search_results]
 
         except Exception as e:
             logger.error(f"Error in web search: {e}")
@@ -47,45 +118,97 @@ class WebSearcher:
 
     def fetch_webpage_content(self, url: str) -> str:
         """Fetch and extract text content from a webpage."""
+        cached = self._cache_get(self._content_cache, url, self.content_cache_ttl)
+        if cached is not None:
+            return cached
+
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+            # Stream the body and stop at the cap instead of buffering the whole page
+            with _SESSION.get(url, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                # Don't download or parse PDFs, images, video etc. as HTML
+                content_type = response.headers.get('Content-Type', '').lower()
+                if content_type and not any(kind in content_type for kind in _TEXT_TYPES):
+                    logger.info(f"Skipping non-HTML content ({content_type}) at {url}")
+                    return ""
+                buf = bytearray()
+                for chunk in response.iter_content(chunk_size=65536):
+                    buf.extend(chunk)
+                    if len(buf) >= MAX_PAGE_BYTES:
+                        break
+
+            import lxml.html  # only paid for when pages are actually fetched
+            root = lxml.html.fromstring(bytes(buf))
+
+            # Remove scripts, styles and page chrome so the 5000-char budget goes to content
+            for element in root.xpath('//script|//style|//nav|//footer|//header|//aside'):
+                element.drop_tree()
+
+            # Collapse whitespace runs in one pass; only a prefix can survive the
+            # length limit, so don't scan the rest (4x leaves room for collapsed runs)
+            text = _WS_RE.sub(' ', root.text_content()[:MAX_TEXT_CHARS * 4]).strip()
+            text = text[:MAX_TEXT_CHARS]  # Limit content length
+            if text:
+                self._cache_put(self._content_cache, url, text, self.content_cache_size)
+            return text
 
-            soup = BeautifulSoup(response.content, 'html.parser')
+        except Exception as e:
+            logger.error(f"Error fetching webpage {url}: {e}")
+            return ""
 
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
+    def fetch_webpages(self, urls: List[str]) -> List[str]:
+        """Fetch several pages concurrently; results are aligned with urls ("" on failure).
 
-            # Get text content
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
+        Different hosts are fetched in parallel, but pages on the same host are
+        fetched one after another so no site sees concurrent requests from us.
+        """
+        pages = [""] * len(urls)
+        by_host: Dict[str, List[int]] = {}
+        for i, url in enumerate(urls):
+            by_host.setdefault(_extract_domain(url), []).append(i)
 
-            return text[:5000]  # Limit content length
+        def fetch_host(indices: List[int]):
+            for i in indices:
+                pages[i] = self.fetch_webpage_content(urls[i])
 
-        except Exception as e:
-            logger.error(f"Error fetching webpage {url}: {e}")
-            return ""
+        wait([self._fetch_pool.submit(fetch_host, indices) for indices in by_host.values()])
+        return pages
+
+    def search_and_extract(self, query: str, num_results: int = 3, fetch_content: bool = False) -> List[Document]:
+        """Search web and return as Document objects.
 
-    def search_and_extract(self, query: str, num_results: int = 3) -> List[Document]:
-        """Search web and return as Document objects."""
+        With fetch_content, each result's page is downloaded (all in parallel)
+        and its text replaces the search snippet when available.
+        """
         search_results = self.search_web(query, num_results)
+        unique_results = []
+        seen_urls = set()
+
+        for result in search_results:
+            # DuckDuckGo can return the same page more than once
+            url_key = result['source'].strip().rstrip('/')
+            if url_key in seen_urls:
+                continue
+            seen_urls.add(url_key)
+            unique_results.append(result)
+
+        if fetch_content:
+            pages = self.fetch_webpages([result['source'] for result in unique_results])
+        else:
+            pages = [""] * len(unique_results)
+
+        # Stable across processes, unlike hash(), so chunk IDs dedup across restarts
+        query_key = hashlib.blake2b(query.encode('utf-8'), digest_size=8).hexdigest()
         documents = []
-
-        for i, result in enumerate(search_results):
+        for i, (result, page) in enumerate(zip(unique_results, pages)):
             doc = Document(
-                page_content=result['content'],
+                page_content=page or result['content'],
                 metadata={
                     'source': result['source'],
                     'source_type': 'web_search',
                     'title': result['title'],
                     'query': query,
-                    'chunk_id': f"web_{hash(query)}_{i}"
+                    'chunk_id': f"web_{query_key}_{i}"
                 }
             )
             documents.append(doc)
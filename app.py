@@ -2,13 +2,14 @@ from flask import Flask, render_template, request, jsonify, send_file
 from flask_cors import CORS
 import os
 import logging
-import json
 from datetime import datetime
 from dotenv import load_dotenv
 from agent.research_agent import ResearchAgent
+from agent.web_searcher import _extract_domain
 import tempfile
 import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
 import shutil
 
@@ -37,6 +38,12 @@ research_cache = {}
 chat_history = []
 processed_documents = set()  # Track processed documents
 
+# Uploaded files are indexed off the request thread, one at a time; clients poll /api/job/<id>
+REINDEX_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reindex")
+JOBS = {}  # job_id -> Future, oldest first
+JOBS_LOCK = threading.Lock()
+MAX_JOBS = 256  # finished jobs beyond this are forgotten, oldest first
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -77,6 +84,32 @@ def get_file_info(file_path):
         logger.error(f"Error getting file info for {file_path}: {e}")
         return None
 
+def _index_file(file_path, filename):
+    """Load one uploaded file into the vector store; returns how many of its chunks are indexed.
+    
+    Raises if the file yields no chunks or the store rejects them, so the job reports failure.
+    """
+    new_documents = agent.doc_processor.load_file(file_path)
+    if not new_documents:
+        raise ValueError(f"No text could be extracted from {filename}")
+    if not agent.vector_store.add_documents(new_documents):
+        raise RuntimeError(f"Vector store rejected the chunks of {filename}")
+    processed_documents.add(filename)
+    logger.info(f"Indexed {len(new_documents)} chunks from {filename}")
+    return len(new_documents)
+
+def _submit_job(fn, *args):
+    """Run fn on the reindex pool and return a job id for /api/job/<id>."""
+    job_id = uuid.uuid4().hex
+    with JOBS_LOCK:
+        JOBS[job_id] = REINDEX_POOL.submit(fn, *args)
+        # Forget the oldest finished jobs; running ones stay pollable
+        excess = len(JOBS) - MAX_JOBS
+        if excess > 0:
+            for old_id in [old_id for old_id, future in JOBS.items() if future.done()][:excess]:
+                del JOBS[old_id]
+    return job_id
+
 @app.route('/api/status')
 def status():
     """Get system status and document list."""
@@ -136,20 +169,14 @@ def upload_document():
             file.save(file_path)
             
             if agent:
-                try:
-                    # Process only the new document
-                    documents = agent.doc_processor.load_documents(UPLOAD_FOLDER)
-                    # Filter to only new documents
-                    new_documents = [doc for doc in documents 
-                                   if doc.metadata.get('source_file') == filename]
-                    
-                    if new_documents:
-                        agent.vector_store.add_documents(new_documents)
-                        processed_documents.add(filename)
-                        logger.info(f"Added {len(new_documents)} chunks from {filename} to vector store")
-                except Exception as e:
-                    logger.error(f"Error adding document to vector store: {e}")
-                    return jsonify({'error': f'Failed to process document: {str(e)}'}), 500
+                # Embedding can take a while, so index in the background and return at once
+                job_id = _submit_job(_index_file, file_path, filename)
+                return jsonify({
+                    'message': f'File {filename} uploaded, indexing started',
+                    'filename': filename,
+                    'job_id': job_id,
+                    'status': 'indexing'
+                }), 202
             
             return jsonify({
                 'message': f'File {filename} uploaded and processed successfully',
@@ -163,6 +190,28 @@ def upload_document():
         logger.error(f"Upload error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/job/<job_id>')
+def job_status(job_id):
+    """Report the progress of a background indexing job."""
+    with JOBS_LOCK:
+        future = JOBS.get(job_id)
+    if future is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if not future.done():
+        return jsonify({'job_id': job_id, 'status': 'indexing'})
+    
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Error adding document to vector store: {error}")
+        return jsonify({
+            'job_id': job_id,
+            'status': 'failed',
+            'error': f'Failed to process document: {str(error)}'
+        })
+    
+    return jsonify({'job_id': job_id, 'status': 'done', 'chunks_indexed': future.result()})
+
 @app.route('/api/delete-document/<filename>', methods=['DELETE'])
 def delete_document(filename):
     """Delete a document with improved cleanup."""
@@ -240,7 +289,8 @@ def chat():
                 display_input = str(tool_input)
             
             # Truncate long outputs for better readability
-            output_text = str(step[1])
+            observation = step[1]
+            output_text = observation if isinstance(observation, str) else str(observation)
             if len(output_text) > 800:
                 output_text = output_text[:800] + '... [truncated]'
             
@@ -262,13 +312,9 @@ def chat():
                 source_name = os.path.basename(source_name) if source_name else 'Local Document'
             elif source.get('url'):
                 # For web sources, use domain name if available
-                try:
-                    from urllib.parse import urlparse
-                    domain = urlparse(source['url']).netloc
-                    if domain:
-                        source_name = f"{source_name} ({domain})"
-                except:
-                    pass
+                domain = _extract_domain(source['url'])
+                if domain:
+                    source_name = f"{source_name} ({domain})"
             
             formatted_sources.append({
                 'name': source_name,
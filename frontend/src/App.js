@@ -307,6 +307,18 @@ const FileUpload = ({ onUpload }) => {
       const result = await response.json();
       
       if (response.ok) {
+        // Indexing runs in the background; wait for it before refreshing the list
+        if (result.job_id) {
+          let job = result;
+          while (job.status === 'indexing') {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const jobResponse = await fetch(`${API_BASE}/api/job/${result.job_id}`);
+            job = await jobResponse.json();
+          }
+          if (job.status !== 'done') {
+            throw new Error(job.error || 'Indexing failed');
+          }
+        }
         onUpload(result.message);
         if (fileInputRef.current) {
           fileInputRef.current.value = '';
@@ -0,0 +1,66 @@
+"""Shared fixtures: vector stores backed by a small deterministic embedding function."""
+import hashlib
+
+import numpy as np
+import pytest
+from chromadb.api.types import EmbeddingFunction
+from langchain.schema import Document
+
+from agent.vector_store import VectorStoreManager
+from agent.vector_store_hnsw import HnswlibVectorStore
+
+STUB_DIM = 32
+
+
+class StubEmbeddingFunction(EmbeddingFunction):
+    """Bag-of-words hashing embedder; texts sharing words land close together."""
+
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        self.texts += len(input)
+        embeddings = []
+        for text in input:
+            vec = np.zeros(STUB_DIM, dtype=np.float32)
+            for word in text.lower().split():
+                digest = hashlib.blake2b(word.encode('utf-8'), digest_size=2).digest()
+                vec[int.from_bytes(digest, 'little') % STUB_DIM] += 1.0
+            norm = np.linalg.norm(vec)
+            embeddings.append(vec / norm if norm else vec)
+        return embeddings
+
+
+def _stubbed(base):
+    class Stubbed(base):
+        def _create_embedding_function(self):
+            return StubEmbeddingFunction()
+
+        def _create_gpu_encoder(self, device=None):
+            return None
+
+    return Stubbed
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    """Factory for stores persisted under tmp_path, reopenable by passing the same name."""
+    def make(name="store", backend=VectorStoreManager):
+        return _stubbed(backend)(persist_directory=str(tmp_path / name))
+    return make
+
+
+@pytest.fixture
+def make_hnsw_store(make_store):
+    return lambda name="store": make_store(name, HnswlibVectorStore)
+
+
+def local_doc(text, source="notes.txt", chunk_id=0):
+    """A chunk shaped like DocumentProcessor output for a local file."""
+    return Document(page_content=text, metadata={
+        'source_file': source,
+        'source_type': 'local_document',
+        'chunk_id': f"doc_{chunk_id}",
+    })
@@ -0,0 +1,108 @@
+"""Behavior checks for background document indexing and /api/job/<id>."""
+import io
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import app as app_module
+from agent.document_processor import DocumentProcessor
+
+
+class TextProcessor(DocumentProcessor):
+    """Loads uploads as plain text, so the tests don't need the PDF and Markdown loaders."""
+
+    def load_file(self, file_path):
+        with open(file_path, encoding='utf-8') as f:
+            text = f.read()
+        return self.process_text(text, os.path.basename(file_path), "local_document") if text else []
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, make_store):
+    upload_dir = tmp_path / "documents"
+    upload_dir.mkdir()
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(upload_dir))
+    monkeypatch.setattr(app_module, "processed_documents", set())
+    monkeypatch.setattr(app_module, "JOBS", {})
+    fake_agent = SimpleNamespace(doc_processor=TextProcessor(), vector_store=make_store())
+    monkeypatch.setattr(app_module, "agent", fake_agent)
+    return app_module.app.test_client()
+
+
+def _upload(client, name, text):
+    response = client.post('/api/upload-document',
+                           data={'file': (io.BytesIO(text.encode('utf-8')), name)},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['status'] == 'indexing'
+    return body['job_id']
+
+
+def _finished(client, job_id):
+    app_module.JOBS[job_id].exception(timeout=30)
+    return client.get(f'/api/job/{job_id}')
+
+
+def test_unknown_job_is_404(client):
+    response = client.get('/api/job/does-not-exist')
+    assert response.status_code == 404
+
+
+def test_running_job_reports_indexing(client):
+    release = threading.Event()
+    job_id = app_module._submit_job(release.wait)
+    try:
+        assert client.get(f'/api/job/{job_id}').get_json()['status'] == 'indexing'
+    finally:
+        release.set()
+    assert _finished(client, job_id).get_json()['status'] == 'done'
+
+
+def test_upload_indexes_in_background(client):
+    job_id = _upload(client, "energy.md", "Solar panels convert sunlight into electricity.\n\n" * 5)
+    body = _finished(client, job_id).get_json()
+    assert body['status'] == 'done'
+    assert body['chunks_indexed'] >= 1
+    assert app_module.agent.vector_store.collection.count() == body['chunks_indexed']
+    assert "energy.md" in app_module.processed_documents
+
+
+def test_upload_without_text_fails(client):
+    job_id = _upload(client, "empty.md", "")
+    body = _finished(client, job_id).get_json()
+    assert body['status'] == 'failed'
+    assert "No text could be extracted from empty.md" in body['error']
+    assert "empty.md" not in app_module.processed_documents
+
+
+def test_rejected_chunks_fail_the_job(client, monkeypatch):
+    monkeypatch.setattr(app_module.agent.vector_store, "add_documents", lambda documents: False)
+    job_id = _upload(client, "energy.md", "Solar panels convert sunlight into electricity.")
+    body = _finished(client, job_id).get_json()
+    assert body['status'] == 'failed'
+    assert body['error'].startswith("Failed to process document:")
+    assert "energy.md" not in app_module.processed_documents
+
+
+def test_finished_jobs_are_evicted_first(client, monkeypatch):
+    monkeypatch.setattr(app_module, "MAX_JOBS", 2)
+    first = app_module._submit_job(int)
+    app_module.JOBS[first].result(timeout=30)
+    second = app_module._submit_job(int)
+    app_module.JOBS[second].result(timeout=30)
+
+    release = threading.Event()
+    blocking = app_module._submit_job(release.wait)
+    try:
+        assert list(app_module.JOBS) == [second, blocking]
+        # The pool has one worker, so these queue behind the blocking job
+        queued = [app_module._submit_job(int) for _ in range(2)]
+        # Nothing finished is left to evict, so running and queued jobs stay pollable
+        assert list(app_module.JOBS) == [blocking] + queued
+        assert client.get(f'/api/job/{queued[-1]}').get_json()['status'] == 'indexing'
+    finally:
+        release.set()
+    assert _finished(client, queued[-1]).get_json()['status'] == 'done'
@@ -0,0 +1,46 @@
+"""Regression checks for the chunk-ID Bloom filter."""
+import pytest
+
+from agent.vector_store import _BloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = _BloomFilter(capacity=10_000, error_rate=1e-3)
+    keys = [f"chunk_{i}" for i in range(10_000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = _BloomFilter(capacity=10_000, error_rate=1e-2)
+    for i in range(10_000):
+        bloom.add(f"chunk_{i}")
+    false_positives = sum(f"other_{i}" in bloom for i in range(10_000))
+    assert false_positives < 300  # 3x headroom over the configured 1%
+
+
+def test_bloom_filter_save_load_round_trip(tmp_path):
+    bloom = _BloomFilter(capacity=1000, error_rate=1e-3)
+    keys = [f"chunk_{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    path = str(tmp_path / "bloom.bin")
+    bloom.save(path)
+    # Saving again replaces the file in place
+    bloom.save(path)
+
+    loaded = _BloomFilter.load(path)
+    assert (loaded.num_bits, loaded.num_hashes) == (bloom.num_bits, bloom.num_hashes)
+    assert loaded.bits == bloom.bits
+    assert all(key in loaded for key in keys)
+    assert list(tmp_path.iterdir()) == [tmp_path / "bloom.bin"]
+
+
+def test_bloom_filter_rejects_truncated_file(tmp_path):
+    bloom = _BloomFilter(capacity=1000)
+    path = tmp_path / "bloom.bin"
+    bloom.save(str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        _BloomFilter.load(str(path))
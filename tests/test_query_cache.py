@@ -0,0 +1,89 @@
+"""Regression checks for the approximate, int8-quantized query cache."""
+import time
+
+import numpy as np
+import pytest
+
+from agent.research_agent import _QueryCache
+
+DIM = 384
+
+
+def _unit(rng) -> np.ndarray:
+    vec = rng.standard_normal(DIM).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def _with_cosine(vec: np.ndarray, cosine: float, rng) -> np.ndarray:
+    """Return a unit vector whose cosine similarity with vec is exactly cosine."""
+    other = rng.standard_normal(DIM).astype(np.float32)
+    other -= other.dot(vec) * vec
+    other /= np.linalg.norm(other)
+    return cosine * vec + np.sqrt(1 - cosine ** 2) * other
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def test_query_cache_empty_misses(rng):
+    assert _QueryCache().get(_unit(rng)) is None
+
+
+def test_query_cache_round_trip(rng):
+    cache = _QueryCache(tolerance=0.05)
+    vec = _unit(rng)
+    cache.put(vec, "answer")
+    assert cache.get(vec) == "answer"
+    # Scale doesn't matter: keys are L2-normalized before quantization
+    assert cache.get(vec * 3.5) == "answer"
+
+
+def test_query_cache_tolerance(rng):
+    cache = _QueryCache(tolerance=0.05)
+    vec = _unit(rng)
+    cache.put(vec, "answer")
+    assert cache.get(_with_cosine(vec, 0.98, rng)) == "answer"
+    assert cache.get(_with_cosine(vec, 0.90, rng)) is None
+    assert cache.get(_unit(rng)) is None
+
+
+def test_query_cache_returns_closest_match(rng):
+    cache = _QueryCache(tolerance=0.05)
+    vec = _unit(rng)
+    cache.put(_with_cosine(vec, 0.96, rng), "near")
+    cache.put(_with_cosine(vec, 0.99, rng), "nearer")
+    assert cache.get(vec) == "nearer"
+
+
+def test_query_cache_ttl_expiry(rng, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = _QueryCache(ttl=60)
+    vec = _unit(rng)
+    cache.put(vec, "answer")
+    now[0] += 59
+    assert cache.get(vec) == "answer"
+    now[0] += 2
+    assert cache.get(vec) is None
+
+
+def test_query_cache_ring_overwrites_oldest(rng):
+    cache = _QueryCache(capacity=2)
+    vecs = [_unit(rng) for _ in range(3)]
+    for i, vec in enumerate(vecs):
+        cache.put(vec, i)
+    assert cache.get(vecs[0]) is None
+    assert cache.get(vecs[1]) == 1
+    assert cache.get(vecs[2]) == 2
+
+
+def test_query_cache_clear(rng):
+    cache = _QueryCache()
+    vec = _unit(rng)
+    cache.put(vec, "answer")
+    cache.clear()
+    assert cache.get(vec) is None
+    cache.put(vec, "again")
+    assert cache.get(vec) == "again"
@@ -0,0 +1,163 @@
+"""Behavior checks for the Chroma-backed VectorStoreManager."""
+import pytest
+from langchain.schema import Document
+
+from tests.conftest import local_doc
+
+DOCS = [
+    local_doc("the quick brown fox jumps over the lazy dog", "animals.txt", 0),
+    local_doc("solar panels convert sunlight into electricity", "energy.txt", 0),
+    local_doc("wind turbines generate power from moving air", "energy.txt", 1),
+]
+
+
+@pytest.fixture
+def store(make_store):
+    return make_store()
+
+
+def _encoder_calls(store):
+    return store.embedding_function.calls
+
+
+def test_embed_query_reuses_normalized_queries(store):
+    first = store.embed_query("Solar Panels")
+    calls = _encoder_calls(store)
+    assert store.embed_query("  solar   PANELS ") is first
+    assert _encoder_calls(store) == calls
+
+
+def test_embed_query_evicts_least_recently_used(store):
+    store.query_cache_size = 2
+    store.embed_query("alpha")
+    store.embed_query("beta")
+    store.embed_query("alpha")  # refreshes alpha, so beta is the oldest
+    store.embed_query("gamma")
+    calls = _encoder_calls(store)
+    store.embed_query("alpha")
+    assert _encoder_calls(store) == calls
+    store.embed_query("beta")
+    assert _encoder_calls(store) == calls + 1
+
+
+def test_similarity_search_embeds_repeated_query_once(store):
+    assert store.add_documents(DOCS)
+    store.similarity_search("solar panels sunlight", score_threshold=1.0)
+    calls = _encoder_calls(store)
+    results = store.similarity_search("Solar panels  sunlight", score_threshold=1.0)
+    assert _encoder_calls(store) == calls
+    assert results[0]['metadata']['source_file'] == "energy.txt"
+
+
+def test_embedding_cache_survives_reopen(make_store):
+    store = make_store()
+    assert store.add_documents(DOCS)
+    store._save_embedding_cache(force=True)
+    assert not store._emb_cache_dirty
+
+    reopened = make_store()
+    assert len(reopened._emb_cache) == len(DOCS)
+    texts = [doc.page_content for doc in DOCS]
+    encoded = reopened.embedding_function.texts
+    cached = reopened.embed_documents_cached(texts)
+    assert reopened.embedding_function.texts == encoded
+    # Stored as float16, so equal to the fresh vectors up to rounding
+    for cached_emb, fresh_emb in zip(cached, store.embed_documents(texts)):
+        assert abs(cached_emb - fresh_emb).max() < 1e-3
+
+
+def _corpus(n=40):
+    words = "solar wind tidal coal nuclear hydro battery grid storage carbon".split()
+    return [local_doc(" ".join(words[(i + j * 3) % len(words)] for j in range(5)) + f" sample {i}",
+                      f"doc{i}.txt", 0)
+            for i in range(n)]
+
+
+def test_flat_scan_matches_hnsw(store):
+    assert store.add_documents(_corpus())
+    collection = store.collection
+    for query in ["solar wind battery", "coal carbon grid", "tidal hydro storage nuclear"]:
+        embedding = store.embed_query(query)
+        flat = store._flat_query(collection, embedding, 10)
+        hnsw = collection.query(query_embeddings=[embedding], n_results=10,
+                                include=['documents', 'metadatas', 'distances'])
+        # The corpus has ties, so compare the ranked distances rather than the order of equal hits
+        assert flat['distances'][0] == pytest.approx(hnsw['distances'][0], abs=1e-4)
+        for doc_id, doc, metadata in zip(flat['ids'][0], flat['documents'][0], flat['metadatas'][0]):
+            assert store.collection.get(ids=[doc_id])['documents'] == [doc]
+            assert metadata['source_file'].startswith("doc")
+    assert len(store._flat[0]) == 40
+
+
+def test_flat_scan_skips_large_collections(store):
+    store.flat_scan_max = 2
+    assert store.add_documents(DOCS)
+    assert store._flat_query(store.collection, store.embed_query("solar panels"), 4) is None
+    results = store.similarity_search("solar panels sunlight", k=1, score_threshold=1.0)
+    assert results[0]['metadata']['source_file'] == "energy.txt"
+
+
+def test_flat_scan_sees_new_writes(store):
+    assert store.add_documents(DOCS[:2])
+    store.similarity_search("wind turbines moving air", score_threshold=1.0)
+    assert store.add_documents(DOCS[2:])
+    results = store.similarity_search("wind turbines moving air", k=1, score_threshold=1.0)
+    assert results[0]['page_content'] == DOCS[2].page_content
+
+
+def test_sync_documents_removes_stale_and_keeps_current_chunks(store):
+    web_hit = Document(page_content="web results about offshore wind farms and grids",
+                       metadata={'source_file': "https://example.com", 'source_type': 'web_search'})
+    assert store.add_documents(DOCS + [web_hit])
+    encoded = store.embedding_function.texts
+
+    edited = local_doc("wind turbines generate power from fast moving air", "energy.txt", 1)
+    assert store.sync_documents(DOCS[:2] + [edited])
+    # Only the edited chunk is embedded again
+    assert store.embedding_function.texts == encoded + 1
+
+    stored = store.collection.get(include=['documents'])
+    # Web chunks aren't local documents, so sync leaves them alone
+    assert sorted(stored['documents']) == sorted(
+        [DOCS[0].page_content, DOCS[1].page_content, edited.page_content, web_hit.page_content])
+    assert set(store._chunk_meta) == set(stored['ids'])
+
+
+def _collection_names(store):
+    return sorted(collection.name for collection in store.client.list_collections())
+
+
+def test_bulk_load_swaps_in_new_collection(store):
+    assert store.add_documents(DOCS)
+    old = store.collection
+    replacement = [local_doc("tidal energy follows the pull of the moon", "tides.txt", 0)]
+    assert store.bulk_load(replacement)
+
+    assert store.collection is not old
+    assert store.collection.name == "documents"
+    assert _collection_names(store) == ["documents"]
+    results = store.similarity_search("tidal energy moon", k=4, score_threshold=1.0)
+    assert [r['metadata']['source_file'] for r in results] == ["tides.txt"]
+    assert set(store._chunk_meta) == set(store.collection.get(include=[])['ids'])
+
+
+def test_failed_swap_restores_live_collection(store, monkeypatch):
+    assert store.add_documents(DOCS)
+    old = store.collection
+    collection_class = type(old)
+    modify = collection_class.modify
+
+    def fail_staging_rename(self, *args, **kwargs):
+        # Renaming the live collection aside and back works; promoting staging fails
+        if kwargs.get('name') == "documents" and "_old_" not in self.name:
+            raise RuntimeError("rename failed")
+        return modify(self, *args, **kwargs)
+
+    monkeypatch.setattr(collection_class, "modify", fail_staging_rename)
+    assert not store.bulk_load([local_doc("tidal energy follows the pull of the moon", "tides.txt", 0)])
+
+    assert store.collection is old
+    assert _collection_names(store) == ["documents"]
+    assert store.client.get_collection("documents").count() == len(DOCS)
+    results = store.similarity_search("solar panels sunlight", k=1, score_threshold=1.0)
+    assert results[0]['metadata']['source_file'] == "energy.txt"
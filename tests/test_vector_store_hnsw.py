@@ -0,0 +1,114 @@
+"""Behavior checks for the hnswlib + SQLite vector store backend."""
+import os
+
+import pytest
+
+from tests.conftest import local_doc
+
+DOCS = [
+    local_doc("the quick brown fox jumps over the lazy dog", "animals.txt", 0),
+    local_doc("solar panels convert sunlight into electricity", "energy.txt", 0),
+    local_doc("wind turbines generate power from moving air", "energy.txt", 1),
+]
+
+
+def _ids(results):
+    return [result['id'] for result in results]
+
+
+@pytest.fixture
+def store(make_hnsw_store):
+    store = make_hnsw_store()
+    assert store.add_documents(DOCS)
+    return store
+
+
+def test_add_and_search(store):
+    assert store.count() == 3
+    results = store.similarity_search("solar panels sunlight", k=1, score_threshold=1.0)
+    assert results[0]['metadata']['source_file'] == "energy.txt"
+    assert results[0]['page_content'].startswith("solar panels")
+    assert store.get_chunk_meta(results[0]['id'])[0] == "energy.txt"
+
+
+def test_readding_skips_stored_chunks(store):
+    revision = store.revision
+    assert store.add_documents(DOCS + [DOCS[0]])
+    assert store.count() == 3
+    assert store.revision == revision
+
+
+def test_failed_index_update_rolls_back_rows(store, monkeypatch):
+    class FailingIndex:
+        def __init__(self, index):
+            self._index = index
+
+        def __getattr__(self, name):
+            return getattr(self._index, name)
+
+        def add_items(self, *args, **kwargs):
+            raise RuntimeError("index full")
+
+    monkeypatch.setattr(store, "index", FailingIndex(store.index))
+    assert not store.add_documents([local_doc("geothermal plants tap heat from the earth", "energy.txt", 2)])
+    assert store.count() == 3
+
+    monkeypatch.undo()
+    assert store.add_documents([local_doc("geothermal plants tap heat from the earth", "energy.txt", 2)])
+    assert store.count() == 4
+
+
+def test_delete_by_source(store):
+    assert store.delete_by_source("energy.txt")
+    assert store.count() == 1
+    results = store.similarity_search("solar panels sunlight", k=4, score_threshold=1.0)
+    assert {r['metadata']['source_file'] for r in results} == {"animals.txt"}
+
+
+def test_sync_documents_removes_stale_chunks(store):
+    kept = DOCS[:2]
+    assert store.sync_documents(kept)
+    assert store.count() == 2
+    results = store.similarity_search("wind turbines moving air", k=4, score_threshold=1.0)
+    assert "wind" not in " ".join(r['page_content'] for r in results)
+
+
+def test_bulk_load_replaces_contents(store):
+    replacement = [local_doc("tidal energy follows the pull of the moon", "tides.txt", 0)]
+    assert store.bulk_load(replacement)
+    assert store.count() == 1
+    results = store.similarity_search("tidal energy moon", k=4, score_threshold=1.0)
+    assert [r['metadata']['source_file'] for r in results] == ["tides.txt"]
+    assert store.get_chunk_meta(_ids(results)[0])[0] == "tides.txt"
+    assert not os.path.exists(f"{store._index_path}.tmp")
+
+    # New chunks continue from the bulk-loaded labels
+    assert store.add_documents([DOCS[0]])
+    assert store.count() == 2
+
+
+def test_failed_bulk_load_keeps_current_index(store, monkeypatch):
+    before = _ids(store.similarity_search("solar panels sunlight", k=3, score_threshold=1.0))
+
+    def fail(texts):
+        raise RuntimeError("encoder crashed")
+
+    monkeypatch.setattr(store, "embed_documents_cached", fail)
+    assert not store.bulk_load([local_doc("tidal energy follows the pull of the moon", "tides.txt", 0)])
+    assert store.count() == 3
+    assert _ids(store.similarity_search("solar panels sunlight", k=3, score_threshold=1.0)) == before
+    tables = [row[0] for row in store._db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    assert tables == ["chunks"]
+
+
+def test_index_and_rows_persist_across_reopen(make_hnsw_store):
+    store = make_hnsw_store()
+    assert store.add_documents(DOCS)
+    assert store.bulk_load(DOCS[1:])
+
+    reopened = make_hnsw_store()
+    assert reopened.count() == 2
+    results = reopened.similarity_search("wind turbines moving air", k=1, score_threshold=1.0)
+    assert results[0]['metadata']['source_file'] == "energy.txt"
+    assert reopened.add_documents([DOCS[0]])
+    assert reopened.count() == 3